@@ -97,7 +97,7 @@ class ActivityService:
                 "title": activity.title,
                 "description": activity.description,
                 "metadata": activity.metadata,
-                "createdAt": activity.createdAt.isoformat()
+                "createdAt": activity.createdAt
             }
             for activity in activities
         ]
@@ -256,6 +256,22 @@ async def record_document_delete(
     )
 
 
+async def record_documents_delete(
+    prisma: Prisma,
+    user_id: int,
+    doc_ids: List[int]
+) -> None:
+    """记录批量删除文档活动"""
+    service = ActivityService(prisma)
+    await service.record_activity(
+        user_id=user_id,
+        activity_type=ActivityType.DOCUMENT_DELETE,
+        title="Deleted documents",
+        description=f"Deleted {len(doc_ids)} documents",
+        metadata={"documentIds": doc_ids}
+    )
+
+
 async def record_settings_update(
     prisma: Prisma,
     user_id: int,
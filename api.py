@@ -1,12 +1,21 @@
 """Main API entry point - FastAPI application with route registration."""
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, ORJSONResponse
+from starlette.datastructures import Headers
 from contextlib import asynccontextmanager
+from logging.handlers import QueueHandler, QueueListener
+import logging
+import queue
 
 from auth import prisma
 from redis_service import RedisService
 from config_service import config_service
+from document_store import GroupNameConflictError
+from prisma.errors import PrismaError
+from file_parser import shutdown_parse_pool
+from llm_service import close_http_client
 from routes import (
     auth_router,
     documents_router,
@@ -18,14 +27,32 @@ from routes import (
     export_router,
     source_search_router,
 )
+from routes.documents import FILE_TOO_LARGE_DETAIL, MAX_FILE_SIZE, MAX_UPLOAD_OVERHEAD, UPLOAD_PATHS
 import config
 import uvicorn
 
+logger = logging.getLogger(__name__)
+
+
+def start_log_listener() -> QueueListener:
+    """Send application log records through a queue so a background thread does the writing.
+
+    Request handlers then only enqueue records instead of blocking on stderr.
+    """
+    log_queue = queue.SimpleQueue()
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    listener = QueueListener(log_queue, handler)
+    logging.getLogger().addHandler(QueueHandler(log_queue))
+    listener.start()
+    return listener
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan handler for startup and shutdown."""
     # Startup
+    log_listener = start_log_listener()
     await prisma.connect()
     try:
         await RedisService.connect()
@@ -33,13 +60,16 @@ async def lifespan(app: FastAPI):
         print(f"Failed to connect to Redis: {e}")
     
     # Load system configuration
-    await config_service.load_config()
+    await config_service.load_config(prisma)
 
     yield
 
     # Shutdown
+    shutdown_parse_pool()
+    close_http_client()
     await RedisService.disconnect()
     await prisma.disconnect()
+    log_listener.stop()
 
 
 # Disable docs in production
@@ -49,10 +79,35 @@ redoc_url = "/redoc" if config.ENVIRONMENT == "development" else None
 app = FastAPI(
     title="RAG API",
     lifespan=lifespan,
+    # orjson serializes every router's JSON responses, not just the document routes
+    default_response_class=ORJSONResponse,
     docs_url=docs_url,
     redoc_url=redoc_url
 )
 
+class UploadSizeLimitMiddleware:
+    """Refuse uploads whose declared size is over the limit before reading the body.
+
+    A plain ASGI middleware so other requests, SSE streams included, pass
+    straight through. It is added before CORSMiddleware, which therefore
+    wraps it and puts CORS headers on the 413 as well.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["method"] == "POST" and scope["path"] in UPLOAD_PATHS:
+            content_length = Headers(scope=scope).get("content-length", "")
+            if content_length.isdigit() and int(content_length) > MAX_FILE_SIZE + MAX_UPLOAD_OVERHEAD:
+                response = JSONResponse(status_code=413, content={"detail": FILE_TOO_LARGE_DETAIL})
+                await response(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+
+app.add_middleware(UploadSizeLimitMiddleware)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -62,6 +117,23 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.exception_handler(GroupNameConflictError)
+async def group_name_conflict_handler(request: Request, exc: GroupNameConflictError):
+    """Report duplicate group names as a client error."""
+    return JSONResponse(status_code=400, content={"detail": str(exc)})
+
+
+@app.exception_handler(PrismaError)
+async def database_error_handler(request: Request, exc: PrismaError):
+    """Answer database errors that routes let propagate with a generic 500.
+
+    Registered for the Prisma error type rather than Exception so it runs
+    inside CORSMiddleware and browsers can read the response.
+    """
+    logger.exception("Database error on %s %s", request.method, request.url.path, exc_info=exc)
+    return JSONResponse(status_code=500, content={"detail": "Internal Server Error"})
+
+
 # Register routes
 app.include_router(auth_router)
 app.include_router(documents_router)
@@ -1,18 +1,27 @@
 import os
+import hashlib
+import logging
 import httpx
 from datetime import datetime
 from fastapi import HTTPException, Depends, status, Request
 from fastapi.security import APIKeyCookie, HTTPBearer, HTTPAuthorizationCredentials
 from jose import jwt, JWTError
 from prisma import Prisma
+from prisma.models import User as PrismaUser
 from pydantic import BaseModel
 from typing import Optional
 import config
 from config_service import config_service
+from redis_service import RedisService
+
+logger = logging.getLogger(__name__)
 
 # Initialize Prisma client
 prisma = Prisma()
 
+# Seconds an API key -> user lookup is served from Redis
+API_KEY_CACHE_TTL = 60
+
 # Cookie-based authentication
 cookie_scheme = APIKeyCookie(name="token", auto_error=False)
 security = HTTPBearer(auto_error=False)
@@ -146,6 +155,59 @@ async def get_current_user(
     return user
 
 
+def _api_key_cache_key(api_key_token: str) -> str:
+    """Redis key for a cached API key lookup (the raw key is never stored)."""
+    return f"apikey:{hashlib.sha256(api_key_token.encode()).hexdigest()}"
+
+
+async def _get_cached_api_key_user(api_key_token: str) -> Optional[PrismaUser]:
+    """Return the user cached for an API key, or None on a miss or when Redis is unavailable."""
+    try:
+        cached = await RedisService.get_client().get(_api_key_cache_key(api_key_token))
+    except RuntimeError:
+        return None
+    except Exception as e:
+        logger.warning("API key cache read failed: %s", e)
+        return None
+    return PrismaUser.model_validate_json(cached) if cached is not None else None
+
+
+async def _cache_api_key_user(api_key_token: str, user: PrismaUser, expires_at: Optional[datetime]) -> None:
+    """Cache the user behind a validated API key, never past the key's expiry."""
+    ttl = API_KEY_CACHE_TTL
+    if expires_at:
+        now = datetime.now(expires_at.tzinfo) if expires_at.tzinfo else datetime.utcnow()
+        ttl = min(ttl, int((expires_at - now).total_seconds()))
+        if ttl <= 0:
+            return
+    try:
+        await RedisService.get_client().set(
+            _api_key_cache_key(api_key_token), user.model_dump_json(), ex=ttl
+        )
+    except RuntimeError:
+        pass
+    except Exception as e:
+        logger.warning("API key cache write failed: %s", e)
+
+
+async def invalidate_api_key_cache(*api_key_tokens: str) -> None:
+    """Drop cached lookups for the given API keys."""
+    if not api_key_tokens:
+        return
+    try:
+        await RedisService.get_client().delete(*(_api_key_cache_key(t) for t in api_key_tokens))
+    except RuntimeError:
+        pass
+    except Exception as e:
+        logger.warning("API key cache invalidation failed: %s", e)
+
+
+async def invalidate_user_api_keys(user_id: int) -> None:
+    """Drop cached lookups for every API key of a user (after a ban or settings change)."""
+    api_keys = await prisma.apikey.find_many(where={"userId": user_id})
+    await invalidate_api_key_cache(*(api_key.key for api_key in api_keys))
+
+
 async def get_chat_user(
     token: Optional[str] = Depends(cookie_scheme),
     auth: Optional[HTTPAuthorizationCredentials] = Depends(security),
@@ -159,6 +221,17 @@ async def get_chat_user(
     # 1. Check for API Key in Header (Authorization: Bearer rag-...)
     if auth and auth.credentials.startswith("rag-"):
         api_key_token = auth.credentials
+
+        # Bulk clients reuse one key for many calls; serve repeat lookups from Redis.
+        # lastUsedAt is therefore refreshed at most once per API_KEY_CACHE_TTL.
+        user = await _get_cached_api_key_user(api_key_token)
+        if user is not None:
+            if user.banned:
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN,
+                    detail=user.banReason or "Your account has been banned"
+                )
+            return user
         
         if not prisma.is_connected():
             await prisma.connect()
@@ -193,7 +266,8 @@ async def get_chat_user(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail=user.banReason or "Your account has been banned"
             )
-            
+
+        await _cache_api_key_user(api_key_token, user, api_key.expiresAt)
         return user
 
     # 2. Fallback to standard JWT Authentication (Cookie or Header)
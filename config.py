@@ -51,5 +51,18 @@ RATE_LIMIT_RATE = float(os.environ.get("RATE_LIMIT_RATE", "1.0"))
 GLOBAL_RATE_LIMIT_CAPACITY = int(os.environ.get("GLOBAL_RATE_LIMIT_CAPACITY", "0"))
 GLOBAL_RATE_LIMIT_RATE = float(os.environ.get("GLOBAL_RATE_LIMIT_RATE", "100.0"))
 
+# Smart chunking: content up to this many characters is returned as one chunk without calling the LLM
+SMART_CHUNK_MIN_LLM_SIZE = int(os.environ.get("SMART_CHUNK_MIN_LLM_SIZE", "1500"))
+
+# Vector search: HNSW candidate list size (pgvector hnsw.ef_search, default 40), applied as a database default by init_vector_db.py
+HNSW_EF_SEARCH = int(os.environ.get("HNSW_EF_SEARCH", "100"))
+
+# Vector search: build the HNSW index over half-precision (halfvec) copies of the embeddings.
+# Halves the index size and the bytes read per search; needs pgvector 0.7+
+VECTOR_INDEX_HALFVEC = os.environ.get("VECTOR_INDEX_HALFVEC", "false").lower() == "true"
+
+# File parsing: worker processes per API process for PDF/DOCX extraction
+PARSE_POOL_WORKERS = int(os.environ.get("PARSE_POOL_WORKERS", "2"))
+
 # Environment (development/production)
 ENVIRONMENT = os.environ.get("ENVIRONMENT", "development")
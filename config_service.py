@@ -1,5 +1,6 @@
 from prisma import Prisma
-from typing import Dict, Any, Optional
+from typing import AsyncIterator, Dict, Any, Optional
+from contextlib import asynccontextmanager
 from cryptography.hazmat.primitives import serialization
 from cryptography.hazmat.primitives.asymmetric import rsa
 import config
@@ -7,31 +8,49 @@ import config
 class ConfigService:
     _instance = None
     _config_cache: Dict[str, str] = {}
+    _prisma: Optional[Prisma] = None
 
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(ConfigService, cls).__new__(cls)
         return cls._instance
 
-    async def load_config(self):
-        """Load all system configurations into cache."""
+    @asynccontextmanager
+    async def _connection(self) -> AsyncIterator[Prisma]:
+        """Yield the application's shared Prisma client, or a temporary one if none was given."""
+        if self._prisma is not None:
+            if not self._prisma.is_connected():
+                await self._prisma.connect()
+            yield self._prisma
+            return
+
         prisma = Prisma()
         try:
-            if not prisma.is_connected():
-                await prisma.connect()
-            
-            configs = await prisma.systemconfig.find_many()
-            self._config_cache = {item.key: item.value for item in configs}
-            
-            # Ensure JWT keys exist after loading config
-            await self._ensure_jwt_keys_internal(prisma)
-            
-        except Exception as e:
-            print(f"Failed to load system config: {e}")
+            await prisma.connect()
+            yield prisma
         finally:
             if prisma.is_connected():
                 await prisma.disconnect()
 
+    async def load_config(self, prisma: Optional[Prisma] = None):
+        """Load all system configurations into cache.
+
+        The given client is kept for later lookups and updates, so they share
+        the application's connection instead of opening a new one each call.
+        """
+        if prisma is not None:
+            self._prisma = prisma
+        try:
+            async with self._connection() as prisma:
+                configs = await prisma.systemconfig.find_many()
+                self._config_cache = {item.key: item.value for item in configs}
+                
+                # Ensure JWT keys exist after loading config
+                await self._ensure_jwt_keys_internal(prisma)
+            
+        except Exception as e:
+            print(f"Failed to load system config: {e}")
+
     async def _ensure_jwt_keys_internal(self, prisma: Prisma):
         """Internal method to generate keys using existing connection."""
         if "PRIVATE_KEY" in self._config_cache and "PUBLIC_KEY" in self._config_cache:
@@ -119,44 +138,32 @@ class ConfigService:
             return self._config_cache[key]
         
         # Try database if not in cache (lazy load)
-        prisma = Prisma()
         try:
-            if not prisma.is_connected():
-                await prisma.connect()
-            
-            item = await prisma.systemconfig.find_unique(where={"key": key})
+            async with self._connection() as prisma:
+                item = await prisma.systemconfig.find_unique(where={"key": key})
             if item:
                 self._config_cache[key] = item.value
                 return item.value
         except Exception as e:
             print(f"Error fetching config {key}: {e}")
-        finally:
-            if prisma.is_connected():
-                await prisma.disconnect()
 
         return self.get_value(key, default)
 
     async def set_config(self, key: str, value: str):
         """Set configuration value."""
-        prisma = Prisma()
         try:
-            if not prisma.is_connected():
-                await prisma.connect()
-            
-            await prisma.systemconfig.upsert(
-                where={"key": key},
-                data={
-                    "create": {"key": key, "value": value},
-                    "update": {"value": value}
-                }
-            )
+            async with self._connection() as prisma:
+                await prisma.systemconfig.upsert(
+                    where={"key": key},
+                    data={
+                        "create": {"key": key, "value": value},
+                        "update": {"value": value}
+                    }
+                )
             self._config_cache[key] = value
         except Exception as e:
             print(f"Error setting config {key}: {e}")
             raise
-        finally:
-            if prisma.is_connected():
-                await prisma.disconnect()
 
     async def get_all_configs(self) -> Dict[str, str]:
         """Get all system configurations."""
@@ -258,6 +258,7 @@ class CreditsService:
             "referenceId": transaction.referenceId,
             "referenceType": transaction.referenceType,
             "metadata": transaction.metadata,
-            "createdAt": transaction.createdAt.isoformat(),
-            "updatedAt": transaction.updatedAt.isoformat(),
+            # datetimes are left for the response encoder (orjson) to format
+            "createdAt": transaction.createdAt,
+            "updatedAt": transaction.updatedAt,
         }
\ No newline at end of file
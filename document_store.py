@@ -1,11 +1,56 @@
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Tuple, AsyncIterator
+import asyncio
+import base64
+import binascii
 import json
+import logging
+import struct
 from datetime import datetime
 from prisma import Prisma
+from prisma.errors import RawQueryError, UniqueViolationError
 from embedding_service import EmbeddingService
+from redis_service import RedisService
 from config_service import config_service
 import config
 
+logger = logging.getLogger(__name__)
+
+# Number of texts sent per embedding request when importing a group
+IMPORT_EMBEDDING_BATCH_SIZE = 64
+
+# Number of documents fetched per query when streaming a group export
+EXPORT_STREAM_BATCH_SIZE = 500
+
+# Seconds that a user's group list and document count stay cached in Redis
+USER_CACHE_TTL = 30
+
+# Seconds that a (user, group name) -> group id mapping stays cached in Redis
+GROUP_ID_CACHE_TTL = 60
+
+
+def _pack_float16(values: List[float]) -> str:
+    """Encode a vector as base64 of little-endian float16 values."""
+    return base64.b64encode(struct.pack(f"<{len(values)}e", *values)).decode("ascii")
+
+
+def _unpack_float16(data: str) -> List[float]:
+    """Decode a vector written by _pack_float16.
+
+    Raises:
+        binascii.Error: If data is not valid base64
+        struct.error: If the decoded bytes are not a whole number of float16 values
+    """
+    raw = base64.b64decode(data, validate=True)
+    return list(struct.unpack(f"<{len(raw) // 2}e", raw))
+
+
+class GroupNameConflictError(Exception):
+    """Raised when a user already has a group with the requested name."""
+
+    def __init__(self, message: str = "Group with this name already exists"):
+        super().__init__(message)
+
+
 class DocumentStore:
     def __init__(self):
         # Prisma client is managed globally in api.py, but we can instantiate one here if needed
@@ -16,13 +61,78 @@ class DocumentStore:
         self.db = prisma
         self.embedding_service = EmbeddingService()
 
+    async def _get_embedding(self, text: str) -> List[float]:
+        """Generate an embedding in a worker thread so the event loop isn't blocked."""
+        return await asyncio.to_thread(self.embedding_service.get_embedding, text)
+
+    async def _get_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Generate embeddings for several texts with a single API request."""
+        return await asyncio.to_thread(self.embedding_service.get_embeddings, texts)
+
+    async def _cache_get(self, key: str) -> Any:
+        """Return a cached JSON value, or None on a miss or when Redis is unavailable."""
+        try:
+            cached = await RedisService.get_client().get(key)
+        except RuntimeError:
+            return None
+        except Exception as e:
+            logger.warning("Cache read failed for %s: %s", key, e)
+            return None
+        return json.loads(cached) if cached is not None else None
+
+    async def _cache_set(self, key: str, value: Any, ttl: int = USER_CACHE_TTL) -> None:
+        """Cache a JSON-serializable value for ttl seconds."""
+        try:
+            await RedisService.get_client().set(key, json.dumps(value), ex=ttl)
+        except RuntimeError:
+            pass
+        except Exception as e:
+            logger.warning("Cache write failed for %s: %s", key, e)
+
+    async def _cache_delete(self, *keys: str) -> None:
+        """Remove cached values."""
+        try:
+            await RedisService.get_client().delete(*keys)
+        except RuntimeError:
+            pass
+        except Exception as e:
+            logger.warning("Cache invalidation failed for %s: %s", ", ".join(keys), e)
+
+    async def invalidate_user_cache(self, user_id: int) -> None:
+        """Drop the cached group list and document count after a write."""
+        await self._cache_delete(f"groups:{user_id}", f"doc_count:{user_id}")
+
+    async def _forget_group_name(self, user_id: int, name: str) -> None:
+        """Drop the cached id of a group that was renamed or deleted."""
+        await self._cache_delete(f"group_id:{user_id}:{name}")
+
+    async def resolve_group_id(self, user_id: int, name: str) -> Optional[int]:
+        """Look up a group id by name, using a short-lived Redis cache.
+        
+        Returns:
+            The group ID or None if the user has no group with that name
+        """
+        key = f"group_id:{user_id}:{name}"
+        cached = await self._cache_get(key)
+        if cached is not None:
+            return cached
+        
+        group = await self.db.documentgroup.find_first(
+            where={"userId": user_id, "name": name}
+        )
+        if not group:
+            return None
+        
+        await self._cache_set(key, group.id, ttl=GROUP_ID_CACHE_TTL)
+        return group.id
+
     async def add_document(self, user_id: int, content: str, metadata: Dict[str, Any] = None, group_id: Optional[int] = None) -> int:
         """Add a document to the store. Generates embedding and saves both content and vector."""
         if metadata is None:
             metadata = {}
 
         # 1. Generate embedding
-        embedding = self.embedding_service.get_embedding(content)
+        embedding = await self._get_embedding(content)
         if not embedding:
             raise ValueError("Failed to generate embedding for document")
 
@@ -59,6 +169,7 @@ class DocumentStore:
         if not result:
             raise Exception("Failed to insert document")
 
+        await self.invalidate_user_cache(user_id)
         return result[0]['id']
 
     async def search(
@@ -68,8 +179,9 @@ class DocumentStore:
         threshold: float,
         limit: int = 10,
         offset: int = 0,
-        group_id: Optional[int] = None
-    ) -> Tuple[List[Dict[str, Any]], int]:
+        group_id: Optional[int] = None,
+        include_total: bool = True
+    ) -> Tuple[List[Dict[str, Any]], Optional[int]]:
         """Search for similar documents using vector similarity with pagination.
         
         Args:
@@ -79,13 +191,14 @@ class DocumentStore:
             limit: Maximum number of results
             offset: Offset for pagination
             group_id: Optional group ID to filter results
+            include_total: Whether to run the COUNT query for the total
         
         Returns:
-            Tuple of (results list, total count)
+            Tuple of (results list, total count or None if not requested)
         """
-        query_embedding = self.embedding_service.get_embedding(query)
+        query_embedding = await self._get_embedding(query)
         if not query_embedding:
-            return [], 0
+            return [], 0 if include_total else None
 
         embedding_str = f"[{','.join(map(str, query_embedding))}]"
 
@@ -93,9 +206,19 @@ class DocumentStore:
         # Distance = 1 - Cosine Similarity.
         # So if we want similarity >= 0.8, we want distance <= 0.2.
 
+        # With a halfvec index the rows must be ordered by the indexed
+        # expression for the planner to use it; the reported distance and
+        # the threshold stay on the full-precision vectors
+        if config.VECTOR_INDEX_HALFVEC:
+            dim = int(config.VECTOR_DIMENSION)
+            order_by = f"(embedding::halfvec({dim}) <=> $1::halfvec({dim}))"
+        else:
+            order_by = "distance"
+
+        count_result = None
         if group_id is not None:
             # Search within a specific group
-            sql = """
+            sql = f"""
                 SELECT
                     id,
                     content,
@@ -105,26 +228,27 @@ class DocumentStore:
                 WHERE "userId" = $2
                   AND "groupId" = $3
                   AND (embedding <=> $1::vector) <= $4
-                ORDER BY distance ASC
+                ORDER BY {order_by} ASC
                 LIMIT $5 OFFSET $6
             """
             results = await self.db.query_raw(
                 sql, embedding_str, int(user_id), int(group_id), float(threshold), int(limit), int(offset)
             )
 
-            count_sql = """
-                SELECT COUNT(*)::int as count
-                FROM "Document"
-                WHERE "userId" = $1
-                  AND "groupId" = $2
-                  AND (embedding <=> $3::vector) <= $4
-            """
-            count_result = await self.db.query_raw(
-                count_sql, user_id, group_id, embedding_str, threshold
-            )
+            if include_total:
+                count_sql = """
+                    SELECT COUNT(*)::int as count
+                    FROM "Document"
+                    WHERE "userId" = $1
+                      AND "groupId" = $2
+                      AND (embedding <=> $3::vector) <= $4
+                """
+                count_result = await self.db.query_raw(
+                    count_sql, user_id, group_id, embedding_str, threshold
+                )
         else:
             # Search all documents
-            sql = """
+            sql = f"""
                 SELECT
                     id,
                     content,
@@ -133,24 +257,27 @@ class DocumentStore:
                 FROM "Document"
                 WHERE "userId" = $2
                   AND (embedding <=> $1::vector) <= $3
-                ORDER BY distance ASC
+                ORDER BY {order_by} ASC
                 LIMIT $4 OFFSET $5
             """
             results = await self.db.query_raw(
                 sql, embedding_str, int(user_id), float(threshold), int(limit), int(offset)
             )
 
-            count_sql = """
-                SELECT COUNT(*)::int as count
-                FROM "Document"
-                WHERE "userId" = $1
-                  AND (embedding <=> $2::vector) <= $3
-            """
-            count_result = await self.db.query_raw(
-                count_sql, user_id, embedding_str, threshold
-            )
+            if include_total:
+                count_sql = """
+                    SELECT COUNT(*)::int as count
+                    FROM "Document"
+                    WHERE "userId" = $1
+                      AND (embedding <=> $2::vector) <= $3
+                """
+                count_result = await self.db.query_raw(
+                    count_sql, user_id, embedding_str, threshold
+                )
         
-        total = count_result[0]['count'] if count_result else 0
+        total = None
+        if include_total:
+            total = count_result[0]['count'] if count_result else 0
 
         formatted_results = []
         for row in results:
@@ -165,34 +292,54 @@ class DocumentStore:
 
     async def get_total_documents(self, user_id: int) -> int:
         """Get total number of documents for a user."""
-        return await self.db.document.count(where={"userId": user_id})
+        key = f"doc_count:{user_id}"
+        cached = await self._cache_get(key)
+        if cached is not None:
+            return cached
 
-    async def get_document(self, user_id: int, doc_id: int) -> Optional[Dict[str, Any]]:
-        """Get a single document by ID."""
-        doc = await self.db.document.find_first(
-            where={
-                "id": doc_id,
-                "userId": user_id
-            },
-            include={
-                "group": True
-            }
-        )
+        total = await self.db.document.count(where={"userId": user_id})
+        await self._cache_set(key, total)
+        return total
 
-        if not doc:
+    async def _count_documents(self, user_id: int, group_id: Optional[int] = None) -> int:
+        """Count a user's documents, optionally within one group, from the cached totals."""
+        if group_id is None:
+            return await self.get_total_documents(user_id)
+        groups = await self.get_groups(user_id)
+        return next((g["documentCount"] for g in groups if g["id"] == group_id), 0)
+
+    async def get_document(self, user_id: int, doc_id: int, group_id: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Get a single document by ID, optionally requiring it to be in a group.
+        
+        The group is joined in the same query rather than loaded as a
+        separate relation.
+        """
+        query = """
+            SELECT d.id, d.content, d.metadata, d."createdAt",
+                   g.id as group_id, g.name as group_name, g."createdAt" as group_created_at
+            FROM "Document" d
+            LEFT JOIN "DocumentGroup" g ON d."groupId" = g.id
+            WHERE d.id = $1 AND d."userId" = $2 AND ($3::int IS NULL OR d."groupId" = $3)
+        """
+        result = await self.db.query_raw(query, doc_id, user_id, group_id)
+
+        if not result:
             return None
 
+        doc = result[0]
         group_data = None
-        if doc.group:
-            group_data = doc.group.dict()
-            if 'createdAt' in group_data and hasattr(group_data['createdAt'], 'isoformat'):
-                group_data['createdAt'] = group_data['createdAt'].isoformat()
+        if doc["group_id"]:
+            group_data = {
+                "id": doc["group_id"],
+                "name": doc["group_name"],
+                "createdAt": doc["group_created_at"].isoformat() if doc["group_created_at"] else None
+            }
 
         return {
-            "id": doc.id,
-            "content": doc.content,
-            "metadata": json.loads(doc.metadata) if isinstance(doc.metadata, str) else doc.metadata,
-            "created_at": doc.createdAt.isoformat(),
+            "id": doc["id"],
+            "content": doc["content"],
+            "metadata": json.loads(doc["metadata"]) if isinstance(doc["metadata"], str) else doc["metadata"],
+            "created_at": doc["createdAt"].isoformat(),
             "group": group_data
         }
 
@@ -255,28 +402,94 @@ class DocumentStore:
             "group": group_data
         }
 
-    async def get_documents_by_group_name(self, user_id: int, group_name: str) -> Tuple[List[Dict[str, Any]], Optional[int]]:
-        """Get all documents in a group by group name.
+    async def get_document_in_group_by_name(
+        self, user_id: int, group_name: str, doc_id: int, include_vector: bool = True
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[int]]:
+        """Get a document from a group identified by name, in a single query.
         
         Args:
             user_id: The user ID
             group_name: The group name (case-sensitive)
+            doc_id: The document ID
+            include_vector: Whether to include the embedding vector
             
         Returns:
-            Tuple of (documents list, group_id) or ([], None) if group not found
+            Tuple of (document or None if not in the group, group_id) or
+            (None, None) if group not found
+        """
+        embedding_column = "d.embedding::text" if include_vector else "NULL::text"
+        query = f"""
+            SELECT g.id as group_id, g.name as group_name,
+                   g."createdAt" as group_created_at, g."updatedAt" as group_updated_at,
+                   d.id, d.content, d.metadata, {embedding_column} as embedding_text,
+                   d."createdAt", d."updatedAt"
+            FROM "DocumentGroup" g
+            LEFT JOIN "Document" d ON d."groupId" = g.id AND d.id = $1 AND d."userId" = $2
+            WHERE g."userId" = $2 AND g.name = $3
+        """
+        result = await self.db.query_raw(query, doc_id, user_id, group_name)
+        
+        if not result:
+            return None, None
+        
+        doc = result[0]
+        if doc["id"] is None:
+            return None, doc["group_id"]
+        
+        document = {
+            "id": doc["id"],
+            "content": doc["content"],
+            "metadata": json.loads(doc["metadata"]) if isinstance(doc["metadata"], str) else doc["metadata"],
+            "created_at": doc["createdAt"].isoformat() if doc["createdAt"] else None,
+        }
+        
+        if include_vector:
+            # Parse embedding from text format [x,y,z,...] to list
+            embedding = None
+            if doc["embedding_text"]:
+                embedding_str = doc["embedding_text"].strip("[]")
+                if embedding_str:
+                    embedding = [float(x) for x in embedding_str.split(",")]
+            document["embedding"] = embedding
+            document["updated_at"] = doc["updatedAt"].isoformat() if doc["updatedAt"] else None
+            document["group"] = {"id": doc["group_id"], "name": doc["group_name"]}
+        else:
+            document["group"] = {
+                "id": doc["group_id"],
+                "name": doc["group_name"],
+                "userId": user_id,
+                "createdAt": doc["group_created_at"].isoformat() if doc["group_created_at"] else None,
+                "updatedAt": doc["group_updated_at"].isoformat() if doc["group_updated_at"] else None,
+            }
+        
+        return document, doc["group_id"]
+
+    async def get_documents_by_group_name(
+        self, user_id: int, group_name: str, limit: int = 100, offset: int = 0
+    ) -> Tuple[List[Dict[str, Any]], Optional[int], int]:
+        """Get a page of documents in a group by group name.
+        
+        Args:
+            user_id: The user ID
+            group_name: The group name (case-sensitive)
+            limit: Maximum number of documents to return
+            offset: Number of documents to skip
+            
+        Returns:
+            Tuple of (documents list, group_id, total documents in the group)
+            or ([], None, 0) if group not found
         """
         # Find group by name
-        group = await self.db.documentgroup.find_first(
-            where={"userId": user_id, "name": group_name}
-        )
+        group_id = await self.resolve_group_id(user_id, group_name)
         
-        if not group:
-            return [], None
+        if group_id is None:
+            return [], None, 0
         
-        # Get all documents in the group
-        docs = await self.db.document.find_many(
-            where={"groupId": group.id, "userId": user_id},
-            order={"id": "desc"}
+        # Fetch the page and the total count concurrently
+        where = {"groupId": group_id, "userId": user_id}
+        docs, total = await asyncio.gather(
+            self.db.document.find_many(where=where, order={"id": "desc"}, take=limit, skip=offset),
+            self._count_documents(user_id, group_id),
         )
         
         documents = []
@@ -288,50 +501,64 @@ class DocumentStore:
                 "created_at": doc.createdAt.isoformat()
             })
         
-        return documents, group.id
+        return documents, group_id, total
 
     async def get_documents(
         self,
         user_id: int,
         limit: int = 10,
         offset: int = 0,
-        group_id: Optional[int] = None
-    ) -> Tuple[List[Dict[str, Any]], int]:
-        """Get all documents for a user with pagination."""
+        group_id: Optional[int] = None,
+        include_total: bool = True,
+        before_id: Optional[int] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """Get all documents for a user with pagination.
 
-        where_clause = {"userId": user_id}
-        if group_id is not None:
-            where_clause["groupId"] = group_id
+        With before_id, the page starts after that document (keyset
+        pagination on the id index) and offset is ignored, so deep pages cost
+        the same as the first one.
+        The total is None when include_total is False, which skips the COUNT query.
+        Totals come from the cached document count / group list, so paging
+        through a list does not re-count it on every request.
+        """
 
-        total = await self.db.document.count(where=where_clause)
+        if before_id is not None:
+            offset = 0
 
-        # Use raw SQL to get vector dimension info and preview
+        # Use raw SQL to get vector dimension info and preview; only the
+        # preview slice of each embedding is sent, not the whole vector
         if group_id is not None:
             query = """
                 SELECT d.id, d.content, d.metadata, d."createdAt",
                        CASE WHEN d.embedding IS NOT NULL THEN vector_dims(d.embedding) ELSE NULL END as vector_dim,
-                       CASE WHEN d.embedding IS NOT NULL THEN (d.embedding::text) ELSE NULL END as embedding_preview,
+                       array_to_string((d.embedding::real[])[1:4], ',') as embedding_preview,
                        g.id as group_id, g.name as group_name, g."createdAt" as group_created_at
                 FROM "Document" d
                 LEFT JOIN "DocumentGroup" g ON d."groupId" = g.id
-                WHERE d."userId" = $1 AND d."groupId" = $2
+                WHERE d."userId" = $1 AND d."groupId" = $2 AND ($5::int IS NULL OR d.id < $5)
                 ORDER BY d.id DESC
                 LIMIT $3 OFFSET $4
             """
-            docs = await self.db.query_raw(query, user_id, group_id, limit, offset)
+            docs_query = self.db.query_raw(query, user_id, group_id, limit, offset, before_id)
         else:
             query = """
                 SELECT d.id, d.content, d.metadata, d."createdAt",
                        CASE WHEN d.embedding IS NOT NULL THEN vector_dims(d.embedding) ELSE NULL END as vector_dim,
-                       CASE WHEN d.embedding IS NOT NULL THEN (d.embedding::text) ELSE NULL END as embedding_preview,
+                       array_to_string((d.embedding::real[])[1:4], ',') as embedding_preview,
                        g.id as group_id, g.name as group_name, g."createdAt" as group_created_at
                 FROM "Document" d
                 LEFT JOIN "DocumentGroup" g ON d."groupId" = g.id
-                WHERE d."userId" = $1
+                WHERE d."userId" = $1 AND ($4::int IS NULL OR d.id < $4)
                 ORDER BY d.id DESC
                 LIMIT $2 OFFSET $3
             """
-            docs = await self.db.query_raw(query, user_id, limit, offset)
+            docs_query = self.db.query_raw(query, user_id, limit, offset, before_id)
+
+        total = None
+        if include_total:
+            docs, total = await asyncio.gather(docs_query, self._count_documents(user_id, group_id))
+        else:
+            docs = await docs_query
 
         documents = []
         for doc in docs:
@@ -354,14 +581,11 @@ class DocumentStore:
             if isinstance(metadata, str):
                 metadata = json.loads(metadata)
 
-            # Extract first 4 values from embedding for preview
+            # The query returns only the first 4 embedding values, comma-separated
             vector_preview = None
             if doc.get("embedding_preview"):
                 try:
-                    emb_str = doc["embedding_preview"].strip("[]")
-                    if emb_str:
-                        values = [float(x) for x in emb_str.split(",")[:4]]
-                        vector_preview = values
+                    vector_preview = [float(x) for x in doc["embedding_preview"].split(",")]
                 except (ValueError, AttributeError):
                     pass
 
@@ -379,6 +603,11 @@ class DocumentStore:
 
     async def get_groups(self, user_id: int) -> List[Dict[str, Any]]:
         """Get all document groups for a user."""
+        key = f"groups:{user_id}"
+        cached = await self._cache_get(key)
+        if cached is not None:
+            return cached
+
         # Use raw query to get counts reliably as Prisma Python client has issues with _count in includes
         query = """
             SELECT g."id", g."name", g."createdAt", COUNT(d."id") as "documentCount"
@@ -391,7 +620,7 @@ class DocumentStore:
         
         groups = await self.db.query_raw(query, user_id)
         
-        return [
+        result = [
             {
                 "id": g["id"],
                 "name": g["name"],
@@ -400,15 +629,21 @@ class DocumentStore:
             }
             for g in groups
         ]
+        await self._cache_set(key, result)
+        return result
 
     async def create_group(self, user_id: int, name: str) -> Dict[str, Any]:
         """Create a new document group."""
-        group = await self.db.documentgroup.create(
-            data={
-                "name": name,
-                "userId": user_id
-            }
-        )
+        try:
+            group = await self.db.documentgroup.create(
+                data={
+                    "name": name,
+                    "userId": user_id
+                }
+            )
+        except UniqueViolationError as e:
+            raise GroupNameConflictError() from e
+        await self.invalidate_user_cache(user_id)
         return {
             "id": group.id,
             "name": group.name,
@@ -426,22 +661,38 @@ class DocumentStore:
         Returns:
             The group ID (existing or newly created)
         """
-        # Try to find existing group
-        existing = await self.db.documentgroup.find_first(
-            where={"userId": user_id, "name": name}
-        )
+        key = f"group_id:{user_id}:{name}"
+        cached = await self._cache_get(key)
+        if cached is not None:
+            return cached
         
-        if existing:
-            return existing.id
+        # Insert-or-select in one statement; concurrent callers cannot
+        # both create the group
+        query = """
+            WITH ins AS (
+                INSERT INTO "DocumentGroup" ("userId", "name", "updatedAt")
+                VALUES ($1, $2, NOW())
+                ON CONFLICT ("userId", "name") DO NOTHING
+                RETURNING id
+            )
+            SELECT id, true AS created FROM ins
+            UNION ALL
+            SELECT id, false AS created FROM "DocumentGroup" WHERE "userId" = $1 AND "name" = $2
+            LIMIT 1
+        """
+        result = await self.db.query_raw(query, user_id, name)
+        if not result:
+            # The conflicting row was committed after this statement's snapshot
+            group_id = await self.resolve_group_id(user_id, name)
+            if group_id is None:
+                raise Exception("Failed to create group")
+            return group_id
         
-        # Create new group
-        group = await self.db.documentgroup.create(
-            data={
-                "name": name,
-                "userId": user_id
-            }
-        )
-        return group.id
+        group_id = result[0]["id"]
+        if result[0]["created"]:
+            await self.invalidate_user_cache(user_id)
+        await self._cache_set(key, group_id, ttl=GROUP_ID_CACHE_TTL)
+        return group_id
 
     async def update_group(self, user_id: int, group_id: int, name: str) -> Optional[Dict[str, Any]]:
         """Update a document group."""
@@ -457,6 +708,8 @@ class DocumentStore:
                 where={"id": group_id},
                 data={"name": name}
             )
+            await self.invalidate_user_cache(user_id)
+            await self._forget_group_name(user_id, existing.name)
             
             # Get count separately
             count = await self.db.document.count(where={"groupId": group_id})
@@ -467,9 +720,50 @@ class DocumentStore:
                 "createdAt": group.createdAt.isoformat(),
                 "documentCount": count
             }
+        except UniqueViolationError as e:
+            raise GroupNameConflictError() from e
         except Exception:
             return None
 
+    async def update_group_by_name(self, user_id: int, name: str, new_name: str) -> Optional[Dict[str, Any]]:
+        """Rename a document group identified by name, in a single query.
+        
+        Returns:
+            Updated group info or None if group not found
+        
+        Raises:
+            GroupNameConflictError: If a group named new_name already exists
+        """
+        query = """
+            UPDATE "DocumentGroup" g
+            SET "name" = $3, "updatedAt" = NOW()
+            WHERE g."userId" = $1 AND g."name" = $2
+            RETURNING g."id", g."name", g."createdAt",
+                      (SELECT COUNT(*) FROM "Document" d WHERE d."groupId" = g."id")::int as "documentCount"
+        """
+        try:
+            result = await self.db.query_raw(query, user_id, name, new_name)
+        except RawQueryError as e:
+            # Raw queries fail with P2010, which carries the database SQLSTATE
+            # in its meta; 23505 is unique_violation
+            meta = ((e.data or {}).get("user_facing_error") or {}).get("meta") or {}
+            if meta.get("code") == "23505":
+                raise GroupNameConflictError() from e
+            raise
+        
+        if not result:
+            return None
+        
+        await self.invalidate_user_cache(user_id)
+        await self._forget_group_name(user_id, name)
+        group = result[0]
+        return {
+            "id": group["id"],
+            "name": group["name"],
+            "createdAt": group["createdAt"].isoformat() if hasattr(group["createdAt"], 'isoformat') else str(group["createdAt"]),
+            "documentCount": group["documentCount"]
+        }
+
     async def delete_group(self, user_id: int, group_id: int, delete_documents: bool = False) -> Optional[Dict[str, Any]]:
         """Delete a document group.
         
@@ -482,51 +776,95 @@ class DocumentStore:
         Returns:
             Dict with deletion info or None if group not found
         """
-        try:
-            # First check ownership
-            group = await self.db.documentgroup.find_unique(
-                where={"id": group_id}
+        # Ownership check, optional document cascade and group delete run as
+        # one statement
+        query = """
+            WITH g AS (
+                SELECT "id", "name" FROM "DocumentGroup" WHERE "id" = $1 AND "userId" = $2
+            ), deleted_docs AS (
+                DELETE FROM "Document"
+                WHERE $3::boolean AND "userId" = $2 AND "groupId" IN (SELECT "id" FROM g)
+                RETURNING 1
+            ), deleted_group AS (
+                DELETE FROM "DocumentGroup" WHERE "id" IN (SELECT "id" FROM g)
+                RETURNING "id"
             )
-            if not group or group.userId != user_id:
-                return None
-            
-            deleted_doc_count = 0
-            
-            if delete_documents:
-                # Delete all documents in the group
-                deleted_doc_count = await self.db.document.delete_many(
-                    where={"groupId": group_id, "userId": user_id}
-                )
-            
-            await self.db.documentgroup.delete(where={"id": group_id})
-            
-            return {
-                "message": "Group deleted successfully",
-                "deletedDocuments": deleted_doc_count
-            }
-        except Exception:
+            SELECT (SELECT "id" FROM deleted_group) as id,
+                   (SELECT "name" FROM g) as name,
+                   (SELECT COUNT(*) FROM deleted_docs)::int as "deletedDocuments"
+        """
+        result = await self.db.query_raw(query, group_id, user_id, delete_documents)
+        
+        if not result or result[0]["id"] is None:
+            return None
+        
+        await self.invalidate_user_cache(user_id)
+        await self._forget_group_name(user_id, result[0]["name"])
+        return {
+            "message": "Group deleted successfully",
+            "deletedDocuments": result[0]["deletedDocuments"]
+        }
+
+    async def delete_group_by_name(
+        self, user_id: int, name: str, delete_documents: bool = False
+    ) -> Optional[Dict[str, Any]]:
+        """Delete a document group identified by name, in a single query.
+        
+        Args:
+            user_id: The user ID
+            name: The group name (case-sensitive)
+            delete_documents: If True, delete all documents in the group.
+                             If False, documents are preserved (groupId set to null).
+        
+        Returns:
+            Dict with deletion info or None if group not found
+        """
+        query = """
+            WITH g AS (
+                SELECT "id" FROM "DocumentGroup" WHERE "userId" = $1 AND "name" = $2
+            ), deleted_docs AS (
+                DELETE FROM "Document"
+                WHERE $3::boolean AND "userId" = $1 AND "groupId" IN (SELECT "id" FROM g)
+                RETURNING 1
+            ), deleted_group AS (
+                DELETE FROM "DocumentGroup" WHERE "id" IN (SELECT "id" FROM g)
+                RETURNING "id"
+            )
+            SELECT (SELECT "id" FROM deleted_group) as id,
+                   (SELECT COUNT(*) FROM deleted_docs)::int as "deletedDocuments"
+        """
+        result = await self.db.query_raw(query, user_id, name, delete_documents)
+        
+        if not result or result[0]["id"] is None:
             return None
+        
+        await self.invalidate_user_cache(user_id)
+        await self._forget_group_name(user_id, name)
+        return {
+            "message": "Group deleted successfully",
+            "deletedDocuments": result[0]["deletedDocuments"]
+        }
 
     async def assign_documents_to_group(self, user_id: int, group_id: Optional[int], doc_ids: List[int]) -> int:
         """Assign documents to a group (or remove from group if group_id is None)."""
         if not doc_ids:
             return 0
             
-        # Verify group ownership if group_id is provided
-        if group_id:
-            group = await self.db.documentgroup.find_unique(
-                where={"id": group_id}
-            )
-            if not group or group.userId != user_id:
-                return 0
-        
-        result = await self.db.document.update_many(
-            where={
-                "id": {"in": doc_ids},
-                "userId": user_id
-            },
-            data={"groupId": group_id}
+        # Group ownership is checked in the same statement, so a foreign
+        # or missing group matches no rows
+        query = """
+            UPDATE "Document"
+            SET "groupId" = $1, "updatedAt" = NOW()
+            WHERE "userId" = $2 AND "id" = ANY($3::int[])
+              AND ($1::int IS NULL OR EXISTS (
+                  SELECT 1 FROM "DocumentGroup" g WHERE g."id" = $1 AND g."userId" = $2
+              ))
+        """
+        result = await self.db.execute_raw(
+            query, group_id or None, user_id, [int(doc_id) for doc_id in doc_ids]
         )
+        if result:
+            await self.invalidate_user_cache(user_id)
         
         return result
 
@@ -554,87 +892,102 @@ class DocumentStore:
         Returns:
             Updated document info or None if document not found
         """
-        # Verify ownership first
-        doc = await self.db.document.find_first(
-            where={
-                "id": doc_id,
-                "userId": user_id
-            },
-            include={"group": True}
-        )
+        # Only the changed columns are written, in a single UPDATE that also
+        # checks ownership and joins the group for the response.
+        params: List[Any] = [doc_id, user_id]
+        set_clauses = []
 
-        if not doc:
-            return None
-
-        # Build update data
-        update_fields = {}
-        
         # If content is provided, regenerate embedding
         if content is not None:
-            embedding = self.embedding_service.get_embedding(content)
+            embedding = await self._get_embedding(content)
             if not embedding:
                 raise ValueError("Failed to generate embedding for document")
-            
-            # Use raw SQL to update content and embedding together
-            metadata_json = json.dumps(metadata if metadata is not None else
-                                       (json.loads(doc.metadata) if isinstance(doc.metadata, str) else doc.metadata))
-            embedding_str = f"[{','.join(map(str, embedding))}]"
-            
-            if update_group:
-                query = """
-                    UPDATE "Document"
-                    SET "content" = $1, "metadata" = $2::jsonb, "embedding" = $3::vector,
-                        "groupId" = $4, "updatedAt" = NOW()
-                    WHERE "id" = $5 AND "userId" = $6
-                    RETURNING id
-                """
-                await self.db.query_raw(query, content, metadata_json, embedding_str, group_id, doc_id, user_id)
-            else:
-                query = """
-                    UPDATE "Document"
-                    SET "content" = $1, "metadata" = $2::jsonb, "embedding" = $3::vector, "updatedAt" = NOW()
-                    WHERE "id" = $4 AND "userId" = $5
-                    RETURNING id
-                """
-                await self.db.query_raw(query, content, metadata_json, embedding_str, doc_id, user_id)
+            params.extend([content, f"[{','.join(map(str, embedding))}]"])
+            set_clauses.append(f'"content" = ${len(params) - 1}, "embedding" = ${len(params)}::vector')
+
+        if metadata is not None:
+            params.append(json.dumps(metadata))
+            set_clauses.append(f'"metadata" = ${len(params)}::jsonb')
+
+        if update_group:
+            params.append(group_id)
+            set_clauses.append(f'"groupId" = ${len(params)}::int')
+
+        columns = '"id", "content", "metadata", "createdAt", "updatedAt", "groupId"'
+        if set_clauses:
+            target = f"""
+                UPDATE "Document"
+                SET {", ".join(set_clauses)}, "updatedAt" = NOW()
+                WHERE "id" = $1 AND "userId" = $2
+                RETURNING {columns}
+            """
         else:
-            # Only update metadata and/or group, no embedding regeneration needed
-            if metadata is not None:
-                update_fields["metadata"] = json.dumps(metadata)
-            
-            if update_group:
-                update_fields["groupId"] = group_id
-            
-            if update_fields:
-                update_fields["updatedAt"] = datetime.utcnow()
-                await self.db.document.update(
-                    where={"id": doc_id},
-                    data=update_fields
-                )
+            target = f'SELECT {columns} FROM "Document" WHERE "id" = $1 AND "userId" = $2'
 
-        # Fetch and return updated document
-        updated_doc = await self.db.document.find_first(
-            where={"id": doc_id, "userId": user_id},
-            include={"group": True}
-        )
+        query = f"""
+            WITH updated AS ({target})
+            SELECT u.*, g.name as group_name, g."createdAt" as group_created_at
+            FROM updated u
+            LEFT JOIN "DocumentGroup" g ON g.id = u."groupId"
+        """
+        result = await self.db.query_raw(query, *params)
 
-        if not updated_doc:
+        if not result:
             return None
 
+        if update_group:
+            await self.invalidate_user_cache(user_id)
+
+        return self._format_document_row(result[0])
+
+    async def move_document(self, user_id: int, doc_id: int, group_id: Optional[int]) -> Optional[Dict[str, Any]]:
+        """Move a document to a group (or out of any group if group_id is None).
+        
+        Ownership of both the document and the target group is checked in the
+        UPDATE itself, so a successful move takes a single query.
+        
+        Returns:
+            Updated document info or None if the document or group was not found
+        """
+        query = """
+            WITH moved AS (
+                UPDATE "Document"
+                SET "groupId" = $3, "updatedAt" = NOW()
+                WHERE "id" = $1 AND "userId" = $2
+                  AND ($3::int IS NULL OR EXISTS (
+                      SELECT 1 FROM "DocumentGroup" WHERE "id" = $3 AND "userId" = $2
+                  ))
+                RETURNING "id", "content", "metadata", "createdAt", "updatedAt", "groupId"
+            )
+            SELECT m.*, g.name as group_name, g."createdAt" as group_created_at
+            FROM moved m
+            LEFT JOIN "DocumentGroup" g ON g.id = m."groupId"
+        """
+        result = await self.db.query_raw(query, doc_id, user_id, group_id)
+        
+        if not result:
+            return None
+        
+        await self.invalidate_user_cache(user_id)
+        return self._format_document_row(result[0])
+
+    @staticmethod
+    def _format_document_row(doc: Dict[str, Any]) -> Dict[str, Any]:
+        """Shape a document row joined with group_name/group_created_at for the API."""
         group_data = None
-        if updated_doc.group:
+        if doc["groupId"]:
             group_data = {
-                "id": updated_doc.group.id,
-                "name": updated_doc.group.name,
-                "createdAt": updated_doc.group.createdAt.isoformat()
+                "id": doc["groupId"],
+                "name": doc["group_name"],
+                "createdAt": doc["group_created_at"].isoformat() if doc["group_created_at"] else None
             }
-
+        
         return {
-            "id": updated_doc.id,
-            "content": updated_doc.content,
-            "metadata": json.loads(updated_doc.metadata) if isinstance(updated_doc.metadata, str) else updated_doc.metadata,
-            "created_at": updated_doc.createdAt.isoformat(),
-            "updated_at": updated_doc.updatedAt.isoformat() if updated_doc.updatedAt else None,
+            "id": doc["id"],
+            "content": doc["content"],
+            "metadata": json.loads(doc["metadata"]) if isinstance(doc["metadata"], str) else doc["metadata"],
+            "created_at": doc["createdAt"].isoformat(),
+            "updated_at": doc["updatedAt"].isoformat() if doc["updatedAt"] else None,
             "group": group_data
         }
 
@@ -652,29 +1005,80 @@ class DocumentStore:
             return False
 
         await self.db.document.delete(where={"id": doc_id})
+        await self.invalidate_user_cache(user_id)
         return True
 
-    async def delete_documents(self, user_id: int, doc_ids: List[int]) -> int:
-        """Batch delete documents."""
+    async def delete_documents(self, user_id: int, doc_ids: List[int]) -> List[int]:
+        """Batch delete documents in a single statement.
+
+        Returns:
+            IDs of the documents that were deleted (IDs not owned by the user are skipped)
+        """
         if not doc_ids:
-            return 0
+            return []
 
-        count = await self.db.document.delete_many(
-            where={
-                "userId": user_id,
-                "id": {"in": doc_ids}
-            }
-        )
+        query = """
+            DELETE FROM "Document"
+            WHERE "userId" = $1 AND "id" = ANY($2::int[])
+            RETURNING id
+        """
+        # Both callers pass ids that Pydantic already validated as List[int]
+        result = await self.db.query_raw(query, user_id, doc_ids)
+        deleted_ids = [row["id"] for row in result]
+        if deleted_ids:
+            await self.invalidate_user_cache(user_id)
+
+        return deleted_ids
+
+    def _export_header(
+        self, group_name: str, include_vectors: bool, vector_dtype: str = "float32"
+    ) -> Dict[str, Any]:
+        """Build the group-level fields of an export."""
+        header = {
+            "version": "1.0",
+            "groupName": group_name,
+            "exportedAt": datetime.utcnow().isoformat() + "Z",
+            "includesVectors": include_vectors,
+        }
+        
+        if include_vectors:
+            # Get actual model name and dimension from config service
+            header["embeddingModel"] = config_service.get_value("EMBEDDING_MODEL_NAME", config.MODEL_NAME)
+            header["vectorDimension"] = int(
+                config_service.get_value("EMBEDDING_VECTOR_DIMENSION", str(config.VECTOR_DIMENSION))
+            )
+            header["vectorDtype"] = vector_dtype
+        
+        return header
 
-        return count
+    def _export_document(self, doc: Dict[str, Any], vector_dtype: str = "float32") -> Dict[str, Any]:
+        """Convert a raw Document row into its export representation.
+        
+        float32 vectors are written as JSON arrays; float16 vectors as
+        base64 strings, about a quarter of the size.
+        """
+        doc_data = {
+            "content": doc["content"],
+            "metadata": json.loads(doc["metadata"]) if isinstance(doc["metadata"], str) else doc["metadata"]
+        }
+        # Parse embedding from text format [x,y,z,...] to list
+        if doc.get("embedding_text"):
+            embedding_str = doc["embedding_text"].strip("[]")
+            if embedding_str:
+                embedding = [float(x) for x in embedding_str.split(",")]
+                doc_data["embedding"] = _pack_float16(embedding) if vector_dtype == "float16" else embedding
+        return doc_data
 
-    async def export_group(self, user_id: int, group_id: int, include_vectors: bool = False) -> Optional[Dict[str, Any]]:
+    async def export_group(
+        self, user_id: int, group_id: int, include_vectors: bool = False, vector_dtype: str = "float32"
+    ) -> Optional[Dict[str, Any]]:
         """Export a document group with all documents.
         
         Args:
             user_id: The user ID
             group_id: The group ID to export
             include_vectors: Whether to include embedding vectors in the export
+            vector_dtype: "float32" (JSON arrays) or "float16" (base64)
             
         Returns:
             Export data dict or None if group not found
@@ -684,59 +1088,74 @@ class DocumentStore:
         if not group or group.userId != user_id:
             return None
         
-        # Get all documents in the group
+        # Get all documents in the group, selecting only the exported columns;
+        # the vector is read only when it is requested
+        columns = "content, metadata"
         if include_vectors:
-            # Use raw query to get vectors
-            query = """
-                SELECT id, content, metadata, embedding::text as embedding_text
-                FROM "Document"
-                WHERE "groupId" = $1 AND "userId" = $2
-                ORDER BY id ASC
-            """
-            docs = await self.db.query_raw(query, group_id, user_id)
-            
-            documents = []
-            for doc in docs:
-                doc_data = {
-                    "content": doc["content"],
-                    "metadata": json.loads(doc["metadata"]) if isinstance(doc["metadata"], str) else doc["metadata"]
-                }
-                # Parse embedding from text format [x,y,z,...] to list
-                if doc["embedding_text"]:
-                    embedding_str = doc["embedding_text"].strip("[]")
-                    if embedding_str:
-                        doc_data["embedding"] = [float(x) for x in embedding_str.split(",")]
-                documents.append(doc_data)
-        else:
-            docs = await self.db.document.find_many(
-                where={"groupId": group_id, "userId": user_id},
-                order={"id": "asc"}
-            )
-            documents = [
-                {
-                    "content": doc.content,
-                    "metadata": json.loads(doc.metadata) if isinstance(doc.metadata, str) else doc.metadata
-                }
-                for doc in docs
-            ]
+            columns += ", embedding::text as embedding_text"
+        query = f"""
+            SELECT {columns}
+            FROM "Document"
+            WHERE "groupId" = $1 AND "userId" = $2
+            ORDER BY id ASC
+        """
+        docs = await self.db.query_raw(query, group_id, user_id)
+        documents = [self._export_document(doc, vector_dtype) for doc in docs]
         
-        # Get actual model name and dimension from config service
-        actual_model_name = config_service.get_value("EMBEDDING_MODEL_NAME", config.MODEL_NAME)
-        actual_dimension = int(config_service.get_value("EMBEDDING_VECTOR_DIMENSION", str(config.VECTOR_DIMENSION)))
+        export_data = self._export_header(group.name, include_vectors, vector_dtype)
+        export_data["documents"] = documents
+        return export_data
+
+    async def export_group_stream(
+        self, user_id: int, group_id: int, include_vectors: bool = False, vector_dtype: str = "float32"
+    ) -> Optional[AsyncIterator[bytes]]:
+        """Export a document group as NDJSON.
         
-        export_data = {
-            "version": "1.0",
-            "groupName": group.name,
-            "exportedAt": datetime.utcnow().isoformat() + "Z",
-            "includesVectors": include_vectors,
-            "documents": documents
-        }
+        The first line holds the same group-level fields as export_group(),
+        followed by one line per document. Documents are read in batches of
+        EXPORT_STREAM_BATCH_SIZE, so memory use does not grow with group size.
+        
+        Args:
+            user_id: The user ID
+            group_id: The group ID to export
+            include_vectors: Whether to include embedding vectors in the export
+            vector_dtype: "float32" (JSON arrays) or "float16" (base64)
+            
+        Returns:
+            An async iterator of encoded lines or None if group not found
+        """
+        # Verify group ownership before the response starts streaming
+        group = await self.db.documentgroup.find_unique(where={"id": group_id})
+        if not group or group.userId != user_id:
+            return None
+        
+        return self._iter_export_lines(user_id, group_id, group.name, include_vectors, vector_dtype)
+
+    async def _iter_export_lines(
+        self, user_id: int, group_id: int, group_name: str, include_vectors: bool, vector_dtype: str
+    ) -> AsyncIterator[bytes]:
+        """Yield the NDJSON lines of a group export."""
+        yield (json.dumps(self._export_header(group_name, include_vectors, vector_dtype)) + "\n").encode()
         
+        columns = "id, content, metadata"
         if include_vectors:
-            export_data["embeddingModel"] = actual_model_name
-            export_data["vectorDimension"] = actual_dimension
+            columns += ", embedding::text as embedding_text"
+        query = f"""
+            SELECT {columns}
+            FROM "Document"
+            WHERE "groupId" = $1 AND "userId" = $2 AND id > $3
+            ORDER BY id ASC
+            LIMIT $4
+        """
         
-        return export_data
+        last_id = 0
+        while True:
+            docs = await self.db.query_raw(query, group_id, user_id, last_id, EXPORT_STREAM_BATCH_SIZE)
+            for doc in docs:
+                yield (json.dumps(self._export_document(doc, vector_dtype)) + "\n").encode()
+            if len(docs) < EXPORT_STREAM_BATCH_SIZE:
+                break
+            last_id = docs[-1]["id"]
 
     async def generate_unique_group_name(self, user_id: int, base_name: str) -> str:
         """Generate a unique group name for the user.
@@ -805,50 +1224,62 @@ class DocumentStore:
         imported_count = 0
         failed_count = 0
         
+        # Collect importable documents; those without vectors are embedded in batches
+        float16_vectors = import_data.get("vectorDtype") == "float16"
+        vector_dimension = import_data.get("vectorDimension")
+        pending: List[Tuple[str, Any, Optional[List[float]]]] = []
         for doc_data in documents:
-            try:
-                content = doc_data.get("content", "")
-                metadata = doc_data.get("metadata", {})
-                
-                if not content:
+            content = doc_data.get("content", "") if isinstance(doc_data, dict) else ""
+            if not content:
+                failed_count += 1
+                continue
+            embedding = doc_data["embedding"] if use_existing_vectors and "embedding" in doc_data else None
+            if float16_vectors and isinstance(embedding, str):
+                try:
+                    embedding = _unpack_float16(embedding)
+                except (binascii.Error, struct.error) as e:
+                    logger.warning("Failed to decode document vector: %s", e)
                     failed_count += 1
                     continue
-                
+                if vector_dimension and len(embedding) != vector_dimension:
+                    logger.warning(
+                        "Document vector has %d dimensions, expected %s", len(embedding), vector_dimension
+                    )
+                    failed_count += 1
+                    continue
+            pending.append((content, doc_data.get("metadata", {}), embedding))
+        
+        missing = [i for i, (_, _, embedding) in enumerate(pending) if embedding is None]
+        for start in range(0, len(missing), IMPORT_EMBEDDING_BATCH_SIZE):
+            batch = missing[start:start + IMPORT_EMBEDDING_BATCH_SIZE]
+            try:
+                embeddings = await self._get_embeddings([pending[i][0] for i in batch])
+            except Exception as e:
+                logger.warning("Failed to generate embeddings for import batch: %s", e)
+                continue
+            for i, embedding in zip(batch, embeddings):
+                content, metadata, _ = pending[i]
+                pending[i] = (content, metadata, embedding)
+        
+        query = """
+            INSERT INTO "Document" ("userId", "content", "metadata", "embedding", "groupId", "updatedAt")
+            VALUES ($1, $2, $3::jsonb, $4::vector, $5, NOW())
+            RETURNING id
+        """
+        for content, metadata, embedding in pending:
+            if not embedding:
+                failed_count += 1
+                continue
+            try:
                 metadata_json = json.dumps(metadata)
-                
-                if use_existing_vectors and "embedding" in doc_data:
-                    # Use pre-existing vectors
-                    embedding = doc_data["embedding"]
-                    embedding_str = f"[{','.join(map(str, embedding))}]"
-                    
-                    query = """
-                        INSERT INTO "Document" ("userId", "content", "metadata", "embedding", "groupId", "updatedAt")
-                        VALUES ($1, $2, $3::jsonb, $4::vector, $5, NOW())
-                        RETURNING id
-                    """
-                    await self.db.query_raw(query, user_id, content, metadata_json, embedding_str, group.id)
-                else:
-                    # Generate new embeddings
-                    embedding = self.embedding_service.get_embedding(content)
-                    if not embedding:
-                        failed_count += 1
-                        continue
-                    
-                    embedding_str = f"[{','.join(map(str, embedding))}]"
-                    
-                    query = """
-                        INSERT INTO "Document" ("userId", "content", "metadata", "embedding", "groupId", "updatedAt")
-                        VALUES ($1, $2, $3::jsonb, $4::vector, $5, NOW())
-                        RETURNING id
-                    """
-                    await self.db.query_raw(query, user_id, content, metadata_json, embedding_str, group.id)
-                
+                embedding_str = f"[{','.join(map(str, embedding))}]"
+                await self.db.query_raw(query, user_id, content, metadata_json, embedding_str, group.id)
                 imported_count += 1
-                
             except Exception as e:
                 print(f"Failed to import document: {e}")
                 failed_count += 1
         
+        await self.invalidate_user_cache(user_id)
         return {
             "group": {
                 "id": group.id,
@@ -3,20 +3,44 @@ File Parser Service for PDF and Word documents.
 Extracts text content from PDF and DOCX files.
 """
 
+import asyncio
 import io
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from typing import Optional
 import ftfy
 
+import config
+
 
 class FileParseError(Exception):
     """Exception raised when file parsing fails."""
     pass
 
 
+# Worker processes for parsing, created on first use
+_parse_pool: Optional[ProcessPoolExecutor] = None
+
+
 class FileParser:
     """Service for parsing PDF and Word documents."""
     
     SUPPORTED_EXTENSIONS = {'.pdf', '.docx', '.doc', '.txt', '.md', '.markdown'}
+    # Sorted list for error messages, built once
+    SUPPORTED_EXTENSIONS_LABEL = ', '.join(sorted(SUPPORTED_EXTENSIONS))
+    
+    # Declared MIME types accepted per extension (text files accept any text/*)
+    CONTENT_TYPES = {
+        '.pdf': {'application/pdf', 'application/x-pdf'},
+        '.docx': {
+            'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+            'application/zip',
+        },
+        '.doc': {'application/msword'},
+    }
+    
+    # Types sent by clients that don't know the file type
+    GENERIC_CONTENT_TYPES = {'', 'application/octet-stream', 'binary/octet-stream'}
     
     @staticmethod
     def parse_pdf(file_bytes: bytes) -> str:
@@ -159,15 +183,49 @@ class FileParser:
         else:
             raise FileParseError(
                 f"Unsupported file type: {ext}. "
-                f"Supported types: {', '.join(sorted(FileParser.SUPPORTED_EXTENSIONS))}"
+                f"Supported types: {FileParser.SUPPORTED_EXTENSIONS_LABEL}"
             )
     
+    @staticmethod
+    def parse_path(filename: str, path: str) -> str:
+        """
+        Parse a file that was saved to disk.
+        
+        The bytes are read here, so when this runs in a worker process the
+        upload is only held in that worker's memory.
+        
+        Args:
+            filename: Original filename with extension
+            path: Path of the saved file
+            
+        Returns:
+            Extracted text content
+            
+        Raises:
+            FileParseError: If file type is not supported or parsing fails
+        """
+        with open(path, 'rb') as f:
+            file_bytes = f.read()
+        return FileParser.parse_file(filename, file_bytes)
+    
     @staticmethod
     def is_supported(filename: str) -> bool:
         """Check if file type is supported."""
         ext = FileParser._get_extension(filename)
         return ext in FileParser.SUPPORTED_EXTENSIONS
     
+    @staticmethod
+    def is_content_type_allowed(filename: str, content_type: Optional[str]) -> bool:
+        """Check that the declared MIME type is consistent with the file extension."""
+        mime = (content_type or '').split(';', 1)[0].strip().lower()
+        if mime in FileParser.GENERIC_CONTENT_TYPES:
+            return True
+        
+        ext = FileParser._get_extension(filename)
+        if ext in {'.txt', '.md', '.markdown'}:
+            return mime.startswith('text/')
+        return mime in FileParser.CONTENT_TYPES.get(ext, set())
+    
     @staticmethod
     def _get_extension(filename: str) -> str:
         """Get lowercase file extension."""
@@ -225,4 +283,51 @@ def parse_file(filename: str, file_bytes: bytes) -> str:
     Returns:
         Extracted text content
     """
-    return FileParser.parse_file(filename, file_bytes)
\ No newline at end of file
+    return FileParser.parse_file(filename, file_bytes)
+
+
+async def parse_path_async(filename: str, path: str) -> str:
+    """
+    Parse a file saved on disk in a worker process.
+    
+    PDF and DOCX extraction is CPU-bound and holds the GIL, so it runs in
+    the parse process pool (config.PARSE_POOL_WORKERS workers) to keep the
+    event loop free. Only the path is sent to the worker, so the upload is
+    never copied through the event loop process.
+    
+    Args:
+        filename: Original filename with extension
+        path: Path of the saved file
+        
+    Returns:
+        Extracted text content
+        
+    Raises:
+        FileParseError: If file type is not supported or parsing fails
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_parse_pool(), FileParser.parse_path, filename, path)
+
+
+def _get_parse_pool() -> ProcessPoolExecutor:
+    """Return the parsing process pool, starting it on first use.
+
+    Workers are started through a forkserver because the API process
+    already runs threads (to_thread workers, the log listener) by then,
+    and forking a threaded process can copy locks held by other threads.
+    """
+    global _parse_pool
+    if _parse_pool is None:
+        _parse_pool = ProcessPoolExecutor(
+            max_workers=config.PARSE_POOL_WORKERS,
+            mp_context=multiprocessing.get_context("forkserver"),
+        )
+    return _parse_pool
+
+
+def shutdown_parse_pool() -> None:
+    """Stop the parsing worker processes."""
+    global _parse_pool
+    if _parse_pool is not None:
+        _parse_pool.shutdown(cancel_futures=True)
+        _parse_pool = None
@@ -39,13 +39,36 @@ async def init_vector_db():
         
         # Create new index
         # Using vector_cosine_ops for cosine similarity (which is what we use in search)
-        create_index_sql = f"""
-            CREATE INDEX "Document_embedding_idx" 
-            ON "Document" 
-            USING hnsw ("embedding" vector_cosine_ops);
-        """
+        if config.VECTOR_INDEX_HALFVEC:
+            # Index half-precision copies; search orders by the same expression
+            create_index_sql = f"""
+                CREATE INDEX "Document_embedding_idx" 
+                ON "Document" 
+                USING hnsw (("embedding"::halfvec({vector_dimension})) halfvec_cosine_ops);
+            """
+        else:
+            create_index_sql = f"""
+                CREATE INDEX "Document_embedding_idx" 
+                ON "Document" 
+                USING hnsw ("embedding" vector_cosine_ops);
+            """
         await prisma.execute_raw(create_index_sql)
         print("HNSW index created successfully.")
+
+        # 3. Widen the HNSW candidate list for every new connection
+        # At pgvector's default of 40 the index scan yields at most 40 rows
+        # before the userId, groupId and distance filters run, so users with
+        # a small share of the table can get back fewer matches than exist.
+        print(f"Setting hnsw.ef_search = {config.HNSW_EF_SEARCH} for the database...")
+        await prisma.execute_raw(f"""
+            DO $$
+            BEGIN
+                EXECUTE format('ALTER DATABASE %I SET hnsw.ef_search = %s',
+                               current_database(), {int(config.HNSW_EF_SEARCH)});
+            END
+            $$;
+        """)
+        print("hnsw.ef_search updated successfully.")
         
     except Exception as e:
         print(f"Error initializing Vector DB: {e}")
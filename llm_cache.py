@@ -0,0 +1,98 @@
+"""Redis-backed memoization of LLM completions."""
+
+import asyncio
+import hashlib
+import json
+from contextlib import aclosing
+from typing import Any, Callable, Dict, List, Optional
+
+from llm_service import LLMService
+from redis_service import RedisService
+
+# Default lifetime of a cached completion, in seconds
+LLM_CACHE_TTL = 3600
+
+
+def llm_cache_key(model_name: str, messages: List[Dict[str, str]], **params: Any) -> str:
+    """Redis key for a completion; every input that shapes the reply is hashed in."""
+    digest = hashlib.blake2b(digest_size=16)
+    for part in (model_name, json.dumps(messages), json.dumps(params, sort_keys=True)):
+        digest.update(part.encode())
+        digest.update(b"\0")
+    return f"llmcache:{digest.hexdigest()}"
+
+
+async def _stream_until(
+    llm_service: LLMService,
+    query: str,
+    contexts: List[Dict[str, Any]],
+    system_prompt: Optional[str],
+    until: Callable[[str], bool],
+    **params: Any,
+) -> str:
+    """Stream a completion and stop reading as soon as until(reply so far) holds."""
+    parts = []
+    stream = llm_service.chat_completion_stream(
+        query=query,
+        contexts=contexts,
+        system_prompt=system_prompt,
+        **params,
+    )
+    # aclosing ends the upstream request right away when we stop early
+    async with aclosing(stream):
+        async for chunk in stream:
+            content = chunk.get("content")
+            if not content:
+                continue
+            parts.append(content)
+            if until("".join(parts)):
+                break
+    return "".join(parts)
+
+
+async def memoized_chat(
+    llm_service: LLMService,
+    query: str,
+    system_prompt: Optional[str] = None,
+    contexts: Optional[List[Dict[str, Any]]] = None,
+    ttl: int = LLM_CACHE_TTL,
+    until: Optional[Callable[[str], bool]] = None,
+    **params: Any,
+) -> str:
+    """Run llm_service.chat_completion in a thread, reusing a cached reply for identical inputs.
+
+    The key covers the full prompt as sent, including retrieved contexts and
+    the configured default system prompt, so a changed input is a new entry.
+    With until, the completion is streamed instead and cut off once
+    until(reply so far) returns True, for callers that only need a prefix.
+    Redis being unavailable or failing only disables the cache; errors from
+    the completion itself propagate as before.
+    """
+    contexts = contexts or []
+    messages = llm_service._build_rag_prompt(query, contexts, system_prompt)
+    key = llm_cache_key(llm_service.model_name, messages, **params)
+
+    try:
+        cached = await RedisService.get_client().get(key)
+        if cached:
+            return cached
+    except Exception:
+        pass
+
+    if until is None:
+        reply = await asyncio.to_thread(
+            llm_service.chat_completion,
+            query=query,
+            contexts=contexts,
+            system_prompt=system_prompt,
+            **params,
+        )
+    else:
+        reply = await _stream_until(llm_service, query, contexts, system_prompt, until, **params)
+
+    if reply and reply.strip():
+        try:
+            await RedisService.get_client().set(key, reply, ex=ttl)
+        except Exception:
+            pass
+    return reply
@@ -2,9 +2,59 @@ import httpx
 import config
 from typing import List, Dict, Any, Optional, AsyncGenerator, TypedDict
 import json
+import threading
 from config_service import config_service
 
 
+def strip_code_fence(text: str) -> str:
+    """Remove a Markdown code fence (e.g. ```json ... ```) wrapped around an LLM reply.
+
+    Drops the opening fence line and, if present, the closing fence line by
+    slicing, without splitting the whole reply into lines.
+    """
+    if not text.startswith("```"):
+        return text
+
+    newline = text.find("\n")
+    if newline == -1:
+        return ""
+    body = text[newline + 1:]
+
+    last_newline = body.rfind("\n")
+    if body[last_newline + 1:].strip().startswith("```"):
+        body = body[:last_newline] if last_newline != -1 else ""
+    return body
+
+
+_http_client: Optional[httpx.Client] = None
+_http_client_lock = threading.Lock()
+
+
+def _get_http_client() -> httpx.Client:
+    """Return the HTTP client shared by all blocking completions.
+
+    Reusing one client keeps upstream connections alive between calls, so
+    repeated completions skip the TCP and TLS handshakes. httpx.Client is
+    safe to use from the worker threads the routes run completions in; the
+    lock keeps concurrent first calls from each building a client.
+    """
+    global _http_client
+    with _http_client_lock:
+        if _http_client is None:
+            # Disable proxies for local connections
+            _http_client = httpx.Client(proxies={"all://": None})
+        return _http_client
+
+
+def close_http_client() -> None:
+    """Close the shared completion client and its pooled connections."""
+    global _http_client
+    with _http_client_lock:
+        if _http_client is not None:
+            _http_client.close()
+            _http_client = None
+
+
 class StreamChunk(TypedDict, total=False):
     """Streaming chunk with content and optional reasoning."""
     content: str
@@ -139,14 +189,11 @@ Instructions for interactions without knowledge base context:
         }
 
         try:
-            # Disable proxies for local connections
-            proxies = {"all://": None}
-            response = httpx.post(
+            response = _get_http_client().post(
                 self.api_url,
                 headers=self.headers,
                 json=payload,
                 timeout=120.0,
-                proxies=proxies
             )
             response.raise_for_status()
             data = response.json()
@@ -0,0 +1,8 @@
+-- DropIndex
+DROP INDEX "Document_userId_idx";
+
+-- CreateIndex
+CREATE INDEX "Document_userId_id_idx" ON "Document"("userId", "id" DESC);
+
+-- CreateIndex
+CREATE INDEX "Document_userId_groupId_id_idx" ON "Document"("userId", "groupId", "id" DESC);
@@ -13,6 +13,12 @@ from typing import Optional, Dict, Any, List
 from prisma import Prisma
 from prisma.models import RedemptionCode
 from credits_service import CreditsService, TransactionType
+from redis_service import RedisService
+
+# Seconds a filtered code count is served from Redis
+CODE_COUNT_CACHE_TTL = 60
+# One hash holds the count for every filter, so a single delete invalidates them all
+CODE_COUNT_CACHE_KEY = "redemption:code_counts"
 
 class RedemptionStatus:
     ACTIVE = "ACTIVE"
@@ -25,6 +31,37 @@ class RedemptionService:
         self.prisma = prisma
         self.credits_service = credits_service
 
+    async def _get_cached_count(self, filter_key: str) -> Optional[int]:
+        """Return a cached code count, or None on a miss or when Redis is unavailable."""
+        try:
+            cached = await RedisService.get_client().hget(CODE_COUNT_CACHE_KEY, filter_key)
+        except RuntimeError:
+            return None
+        except Exception as e:
+            print(f"Code count cache read failed: {e}")
+            return None
+        return int(cached) if cached is not None else None
+
+    async def _cache_count(self, filter_key: str, total: int) -> None:
+        """Cache a code count for CODE_COUNT_CACHE_TTL seconds."""
+        try:
+            client = RedisService.get_client()
+            await client.hset(CODE_COUNT_CACHE_KEY, filter_key, total)
+            await client.expire(CODE_COUNT_CACHE_KEY, CODE_COUNT_CACHE_TTL)
+        except RuntimeError:
+            pass
+        except Exception as e:
+            print(f"Code count cache write failed: {e}")
+
+    async def invalidate_code_counts(self) -> None:
+        """Drop cached code counts after codes are created, change status or are deleted."""
+        try:
+            await RedisService.get_client().delete(CODE_COUNT_CACHE_KEY)
+        except RuntimeError:
+            pass
+        except Exception as e:
+            print(f"Code count cache invalidation failed: {e}")
+
     def _generate_code(self, length: int = 16) -> str:
         """Generate a random alphanumeric code."""
         # Using uppercase letters and digits for readability
@@ -82,6 +119,8 @@ class RedemptionService:
                     pass
                 attempts += 1
         
+        if codes:
+            await self.invalidate_code_counts()
         return codes
 
     async def redeem_code(self, code: str, user_id: int) -> Dict[str, Any]:
@@ -106,6 +145,7 @@ class RedemptionService:
                 where={"id": redemption.id},
                 data={"status": RedemptionStatus.EXPIRED}
             )
+            await self.invalidate_code_counts()
             raise ValueError("Code has expired")
 
         # 3. Process Redemption (Transaction)
@@ -132,6 +172,7 @@ class RedemptionService:
             if not updated_code:
                 # If update failed (e.g. status changed concurrently), fail
                 raise ValueError("Code redemption failed or already used")
+            await self.invalidate_code_counts()
 
             # Add Credits
             transaction = await self.credits_service.add_credits(
@@ -180,7 +221,12 @@ class RedemptionService:
             if max_amount is not None:
                 where_clause["amount"]["lte"] = max_amount
             
-        total = await self.prisma.redemptioncode.count(where=where_clause)
+        # Counting a large code table dominates a page load, so reuse recent counts
+        count_key = f"{status or ''}:{min_amount}:{max_amount}"
+        total = await self._get_cached_count(count_key)
+        if total is None:
+            total = await self.prisma.redemptioncode.count(where=where_clause)
+            await self._cache_count(count_key, total)
         codes = await self.prisma.redemptioncode.find_many(
             where=where_clause,
             skip=skip,
@@ -201,6 +247,7 @@ class RedemptionService:
         result = await self.prisma.redemptioncode.delete_many(
             where={"status": RedemptionStatus.USED}
         )
+        await self.invalidate_code_counts()
         return result
 
     async def delete_expired_codes(self) -> int:
@@ -208,4 +255,5 @@ class RedemptionService:
         result = await self.prisma.redemptioncode.delete_many(
             where={"status": RedemptionStatus.EXPIRED}
         )
+        await self.invalidate_code_counts()
         return result
\ No newline at end of file
@@ -7,6 +7,7 @@ import uuid
 import json
 
 from fastapi import Query
+from fastapi.responses import ORJSONResponse
 
 from schemas import (
     BanInput,
@@ -20,7 +21,7 @@ from schemas import (
     BulkImportResponse,
     BulkAdjustmentItem,
 )
-from auth import get_current_user, prisma
+from auth import get_current_user, prisma, invalidate_api_key_cache, invalidate_user_api_keys
 from redis_service import RedisService
 from config_service import config_service
 from activity_service import record_settings_update, ActivityService
@@ -158,7 +159,7 @@ async def get_users(
         
         users_with_count = []
         for user in users:
-            user_dict = user.dict()
+            user_dict = user.model_dump()
             user_dict["documentCount"] = len(user.documents)
             del user_dict["documents"]
             users_with_count.append(user_dict)
@@ -194,6 +195,7 @@ async def ban_user(user_id: int, input_data: BanInput, current_user=Depends(get_
                 "bannedAt": datetime.utcnow()
             }
         )
+        await invalidate_user_api_keys(user_id)
         return {"message": "User banned successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -210,6 +212,7 @@ async def unban_user(user_id: int, current_user=Depends(get_current_user)):
             where={"id": user_id},
             data={"banned": False, "banReason": None, "bannedAt": None}
         )
+        await invalidate_user_api_keys(user_id)
         return {"message": "User unbanned successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -352,7 +355,7 @@ async def delete_transaction(transaction_id: int, current_user=Depends(get_curre
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/admin/users/{user_id}/activities", response_model=ActivitiesResponse)
+@router.get("/admin/users/{user_id}/activities", responses={200: {"model": ActivitiesResponse}})
 async def get_user_activities(
     user_id: int,
     limit: int = Query(10, ge=1, le=50, description="Number of activities to return"),
@@ -374,7 +377,7 @@ async def get_user_activities(
         )
         total = await service.get_activity_count(user_id)
         
-        return ActivitiesResponse(activities=activities, total=total)
+        return ORJSONResponse({"activities": activities, "total": total})
     except HTTPException:
         raise
     except Exception as e:
@@ -400,6 +403,7 @@ async def update_user_settings(input_data: UpdateSettingsInput, current_user=Dep
                 "similarityThreshold": input_data.similarityThreshold,
             },
         )
+        await invalidate_user_api_keys(current_user.id)
 
         await record_settings_update(
             prisma,
@@ -458,6 +462,7 @@ async def delete_api_key(key_id: int, current_user=Depends(get_current_user)):
             raise HTTPException(status_code=404, detail="API key not found")
             
         await prisma.apikey.delete(where={"id": key_id})
+        await invalidate_api_key_cache(api_key.key)
         return {"message": "API key deleted successfully"}
     except HTTPException:
         raise
@@ -1,7 +1,7 @@
 """Authentication and activity routes."""
 
 from fastapi import APIRouter, HTTPException, Query, Depends, Response, Request
-from fastapi.responses import RedirectResponse
+from fastapi.responses import ORJSONResponse, RedirectResponse
 
 from schemas import (
     UserResponse,
@@ -233,18 +233,8 @@ async def gitee_callback(code: str, request: Request, response: Response):
 @router.get("/auth/me", response_model=UserResponse)
 async def get_me(current_user=Depends(get_current_user)):
     """Get current authenticated user."""
-    return UserResponse(
-        id=current_user.id,
-        githubId=current_user.githubId,
-        giteeId=current_user.giteeId,
-        username=current_user.username,
-        email=current_user.email,
-        avatarUrl=current_user.avatarUrl,
-        role=current_user.role,
-        topK=current_user.topK,
-        similarityThreshold=current_user.similarityThreshold,
-        credits=current_user.credits,
-    )
+    # response_model picks the public fields off the user in a single validation pass
+    return current_user
 
 
 @router.post("/auth/logout")
@@ -262,7 +252,7 @@ async def logout(response: Response):
 # =====================
 
 
-@router.get("/activities", response_model=ActivitiesResponse)
+@router.get("/activities", responses={200: {"model": ActivitiesResponse}})
 async def get_activities(
     limit: int = Query(10, ge=1, le=50, description="Number of activities to return"),
     offset: int = Query(0, ge=0, description="Offset for pagination"),
@@ -276,7 +266,7 @@ async def get_activities(
         )
         total = await service.get_activity_count(current_user.id)
 
-        return ActivitiesResponse(activities=activities, total=total)
+        return ORJSONResponse({"activities": activities, "total": total})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
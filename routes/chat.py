@@ -1,7 +1,8 @@
 """RAG and OpenAI compatible chat routes."""
 
-from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi import APIRouter, HTTPException, Depends, Request, BackgroundTasks
 from fastapi.responses import StreamingResponse
+import asyncio
 import json
 import time
 import uuid
@@ -15,6 +16,7 @@ from schemas import (
 from auth import get_current_user, get_chat_user, prisma
 from document_store import DocumentStore
 from llm_service import LLMService
+from llm_cache import memoized_chat
 from rate_limiter import rate_limit
 from activity_service import record_rag_query
 
@@ -22,11 +24,17 @@ router = APIRouter()
 store = DocumentStore()
 llm_service = LLMService()
 
+# Answers at or below this temperature are reproducible, so they are cached
+RAG_CACHE_MAX_TEMPERATURE = 0.01
 
-@router.post("/rag", response_model=RAGResponse)
+
+@router.post("/rag", responses={200: {"model": RAGResponse}})
 @rate_limit(key_prefix="rag_query")
 async def rag_query(
-    input_data: RAGQueryInput, request: Request, current_user=Depends(get_current_user)
+    input_data: RAGQueryInput,
+    request: Request,
+    background_tasks: BackgroundTasks,
+    current_user=Depends(get_current_user),
 ):
     """RAG (Retrieval Augmented Generation) endpoint.
 
@@ -47,24 +55,38 @@ async def rag_query(
             query=input_data.query,
             threshold=distance_threshold,
             limit=top_k,
+            include_total=False,
         )
 
-        await record_rag_query(prisma, current_user.id, input_data.query)
+        background_tasks.add_task(record_rag_query, prisma, current_user.id, input_data.query)
 
         if not results:
-            return RAGResponse(
-                answer="I couldn't find any relevant documents to answer your question.",
-                sources=[],
+            return {
+                "answer": "I couldn't find any relevant documents to answer your question.",
+                "sources": [],
+            }
+
+        temperature = input_data.temperature
+        if temperature is not None and temperature <= RAG_CACHE_MAX_TEMPERATURE:
+            # Keyed on the full prompt, so new or changed sources miss the cache
+            answer = await memoized_chat(
+                llm_service,
+                query=input_data.query,
+                contexts=results,
+                temperature=temperature,
+                max_tokens=input_data.max_tokens,
+            )
+        else:
+            answer = await asyncio.to_thread(
+                llm_service.chat_completion,
+                query=input_data.query,
+                contexts=results,
+                temperature=temperature,
+                max_tokens=input_data.max_tokens,
             )
 
-        answer = llm_service.chat_completion(
-            query=input_data.query,
-            contexts=results,
-            temperature=input_data.temperature,
-            max_tokens=input_data.max_tokens,
-        )
-
-        return RAGResponse(answer=answer, sources=results)
+        # Sources are the same rows /search returns, so they are not re-validated
+        return {"answer": answer, "sources": results}
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -83,7 +105,10 @@ async def list_models(current_user=Depends(get_current_user)):
 @router.post("/v1/chat/completions")
 @rate_limit(key_prefix="rag_stream")
 async def chat_completions(
-    input_data: OpenAIRequest, request: Request, current_user=Depends(get_chat_user)
+    input_data: OpenAIRequest,
+    request: Request,
+    background_tasks: BackgroundTasks,
+    current_user=Depends(get_chat_user),
 ):
     """OpenAI Compatible Chat Completions Endpoint.
 
@@ -109,19 +134,17 @@ async def chat_completions(
         if actual_model and actual_model != "default":
             # Try to find a matching group by checking all user's groups
             # This handles group names with special characters like "owner/repo"
-            user_groups = await prisma.documentgroup.find_many(
-                where={"userId": current_user.id}
-            )
+            user_groups = await store.get_groups(user_id=current_user.id)
             
             matched_group = None
             matched_model_name = actual_model
             
             # Sort groups by name length (longest first) to match the most specific group
-            sorted_groups = sorted(user_groups, key=lambda g: len(g.name), reverse=True)
+            sorted_groups = sorted(user_groups, key=lambda g: len(g["name"]), reverse=True)
             
             for group in sorted_groups:
                 # Check if model name ends with "-groupname" (with dash separator)
-                suffix_with_dash = f"-{group.name}"
+                suffix_with_dash = f"-{group['name']}"
                 if actual_model.endswith(suffix_with_dash):
                     matched_group = group
                     matched_model_name = actual_model[:-len(suffix_with_dash)]
@@ -129,8 +152,8 @@ async def chat_completions(
                 
                 # Check if model name ends with "groupname" (without dash separator)
                 # Only match if it's a clear suffix (e.g., for "owner/repo" style names)
-                if "/" in group.name and actual_model.endswith(group.name):
-                    potential_model = actual_model[:-len(group.name)]
+                if "/" in group["name"] and actual_model.endswith(group["name"]):
+                    potential_model = actual_model[:-len(group["name"])]
                     # Ensure the model name part is valid (ends with alphanumeric or dash)
                     if potential_model and (potential_model[-1].isalnum() or potential_model[-1] == '-'):
                         matched_group = group
@@ -138,7 +161,7 @@ async def chat_completions(
                         break
             
             if matched_group:
-                group_id_for_search = matched_group.id
+                group_id_for_search = matched_group["id"]
                 actual_model = matched_model_name
             else:
                 # Fallback: try the old dash-based parsing for simple group names
@@ -148,11 +171,9 @@ async def chat_completions(
                     potential_model_name = actual_model[:last_dash_idx]
                     
                     if potential_group_name and "/" not in potential_group_name:
-                        group = await prisma.documentgroup.find_first(
-                            where={"userId": current_user.id, "name": potential_group_name}
-                        )
-                        if group:
-                            group_id_for_search = group.id
+                        group_id = await store.resolve_group_id(current_user.id, potential_group_name)
+                        if group_id is not None:
+                            group_id_for_search = group_id
                             actual_model = potential_model_name
 
         top_k = input_data.top_k or current_user.topK or 5
@@ -180,9 +201,10 @@ async def chat_completions(
             threshold=distance_threshold,
             limit=top_k,
             group_id=group_id_for_search,
+            include_total=False,
         )
 
-        await record_rag_query(prisma, current_user.id, query)
+        background_tasks.add_task(record_rag_query, prisma, current_user.id, query)
 
         async def stream_generator():
             chat_id = f"chatcmpl-{uuid.uuid4()}"
@@ -201,7 +223,7 @@ async def chat_completions(
                             "finish_reason": None,
                         }
                     ],
-                    "sources": [s.dict() if hasattr(s, "dict") else s for s in results],
+                    "sources": [s.model_dump() if hasattr(s, "model_dump") else s for s in results],
                 }
                 yield f"data: {json.dumps(sources_data)}\n\n"
 
@@ -101,6 +101,7 @@ async def index_repo_background(
                 "userId": user_id
             }
         )
+        await store.invalidate_user_cache(user_id)
         
         indexing_tasks[task_id].group_id = group.id
         
@@ -445,6 +446,7 @@ async def reindex_file(
                     "id": {"in": doc_ids}
                 }
             )
+            await store.invalidate_user_cache(current_user.id)
         
         # Fetch and reindex the file
         github_service = GitHubService()
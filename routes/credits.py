@@ -8,10 +8,10 @@ Provides endpoints for:
 """
 
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import ORJSONResponse
 from typing import Optional
-from prisma import Prisma
 
-from auth import get_current_user
+from auth import get_current_user, prisma
 from credits_service import CreditsService, TransactionType
 from schemas import (
     CreditsSummaryResponse,
@@ -25,15 +25,14 @@ from schemas import (
 
 router = APIRouter(prefix="/credits", tags=["credits"])
 
-# Initialize Prisma client
-prisma = Prisma()
-
+# CreditsService only holds the shared Prisma client, so one instance serves every request
+credits_service = CreditsService(prisma)
 
 async def get_credits_service() -> CreditsService:
     """Get credits service instance."""
     if not prisma.is_connected():
         await prisma.connect()
-    return CreditsService(prisma)
+    return credits_service
 
 
 # User Endpoints
@@ -65,7 +64,7 @@ async def get_credits_summary(
         raise HTTPException(status_code=404, detail=str(e))
 
 
-@router.get("/transactions", response_model=TransactionsResponse)
+@router.get("/transactions", responses={200: {"model": TransactionsResponse}})
 async def get_transactions(
     type: Optional[str] = Query(None, description="Filter by transaction type"),
     limit: int = Query(20, ge=1, le=100),
@@ -89,7 +88,8 @@ async def get_transactions(
         offset=offset,
         trans_type=trans_type,
     )
-    return TransactionsResponse(**result)
+    # Returned as a response so orjson encodes the rows directly, datetimes included
+    return ORJSONResponse(result)
 
 
 @router.get("/transactions/{transaction_id}", response_model=TransactionResponse)
@@ -171,7 +171,7 @@ async def admin_get_user_summary(
         raise HTTPException(status_code=404, detail=str(e))
 
 
-@router.get("/admin/user/{user_id}/transactions", response_model=TransactionsResponse)
+@router.get("/admin/user/{user_id}/transactions", responses={200: {"model": TransactionsResponse}})
 async def admin_get_user_transactions(
     user_id: int,
     type: Optional[str] = Query(None),
@@ -199,4 +199,5 @@ async def admin_get_user_transactions(
         offset=offset,
         trans_type=trans_type,
     )
-    return TransactionsResponse(**result)
\ No newline at end of file
+    # Returned as a response so orjson encodes the rows directly, datetimes included
+    return ORJSONResponse(result)
\ No newline at end of file
@@ -1,10 +1,24 @@
 """Document routes including CRUD, groups, search, and file operations."""
 
-from fastapi import APIRouter, HTTPException, Query, Depends, UploadFile, File, Form
-from typing import Optional, List
+from fastapi import APIRouter, HTTPException, Query, Depends, UploadFile, File, Form, Request, Response, BackgroundTasks
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from typing import Any, BinaryIO, Optional, List, Tuple, Type, TypeVar
 from datetime import datetime
 
+import asyncio
+import base64
+import binascii
+import hashlib
 import json
+import logging
+import os
+import re
+import tempfile
+
+import orjson
+from pydantic import BaseModel
+
+import config
 
 from schemas import (
     DocumentInput,
@@ -33,20 +47,144 @@ from schemas import (
 )
 from auth import get_current_user, get_chat_user, prisma
 from document_store import DocumentStore
-from file_parser import FileParser, FileParseError
+from file_parser import FileParser, FileParseError, parse_path_async
 from activity_service import (
     record_document_add,
     record_document_delete,
+    record_documents_delete,
     record_search,
 )
-from llm_service import LLMService
+from llm_service import LLMService, strip_code_fence
 from mcp_client import MCPClient
+from redis_service import RedisService
+
+logger = logging.getLogger(__name__)
 
-router = APIRouter()
+# orjson encodes the large document and vector payloads much faster than json
+router = APIRouter(default_response_class=ORJSONResponse)
 store = DocumentStore()
+llm_service = LLMService()
+# Shared so the MCP client's pooled HTTP session is reused across requests
+mcp_client = MCPClient()
 
 # Maximum file size: 50MB
 MAX_FILE_SIZE = 50 * 1024 * 1024
+# Allowance for multipart boundaries and form fields in the request body
+MAX_UPLOAD_OVERHEAD = 1024 * 1024
+# Routes whose request body carries a file of up to MAX_FILE_SIZE
+UPLOAD_PATHS = ("/documents/parse", "/documents/upload")
+FILE_TOO_LARGE_DETAIL = f"File too large. Maximum size is {MAX_FILE_SIZE // (1024 * 1024)}MB"
+# Uploads are copied to a temp file in pieces of this size
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Sentence boundary for fallback chunking (ASCII and CJK terminators)
+_SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?])\s+|(?<=[。！？])\s*")
+
+# JSON verdicts embedded in LLM replies (fact check / knowledge check), with a
+# looser match for any flat JSON object as fallback
+_CREDIBILITY_JSON_RE = re.compile(r'\{[\s\S]*?"credibility_score"[\s\S]*?"verdict"[\s\S]*?"analysis"[\s\S]*?\}')
+_CONSISTENCY_JSON_RE = re.compile(r'\{[\s\S]*?"consistency_score"[\s\S]*?"verdict"[\s\S]*?"analysis"[\s\S]*?\}')
+_FLAT_JSON_RE = re.compile(r'\{[^{}]+\}')
+
+# URL import: crawled text with this many Markdown structure lines and no HTML
+# tags is returned as-is instead of being reformatted by the LLM
+_MARKDOWN_LINE_RE = re.compile(r"^(?:#{1,6} |[*+-] |\d+\. |```|> )", re.M)
+_HTML_TAG_RE = re.compile(r"</?(?:html|body|div|span|p|a|br|table|tr|td|ul|li|script|style)\b", re.I)
+URL_IMPORT_MARKDOWN_MIN_LINES = 10
+
+# Smart chunking: above this size the content is pre-split into sections chunked in parallel
+SMART_CHUNK_SECTION_THRESHOLD = 20000
+SMART_CHUNK_SECTION_SIZE = 4000
+SMART_CHUNK_MAX_CONCURRENCY = 4
+
+# Smart-chunk and fact-check results for identical content are reused for a day
+LLM_RESULT_CACHE_TTL = 86400
+
+ResponseModel = TypeVar("ResponseModel", bound=BaseModel)
+
+
+def looks_like_markdown(text: str) -> bool:
+    """Whether crawled text is already clean Markdown."""
+    if _HTML_TAG_RE.search(text):
+        return False
+    matches = 0
+    for _ in _MARKDOWN_LINE_RE.finditer(text):
+        matches += 1
+        if matches >= URL_IMPORT_MARKDOWN_MIN_LINES:
+            return True
+    return False
+
+
+def ceil_div(a: int, b: int) -> int:
+    """Integer ceiling division."""
+    return -(-a // b)
+
+
+def compute_etag(payload: Any) -> str:
+    """Weak ETag derived from the JSON form of a response payload."""
+    digest = hashlib.md5(orjson.dumps(payload, option=orjson.OPT_SORT_KEYS)).hexdigest()
+    return f'W/"{digest}"'
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    """Check whether the client's If-None-Match already covers the ETag."""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    return if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]
+
+
+def encode_cursor(doc_id: int) -> str:
+    """Opaque pagination cursor pointing after the given document."""
+    return base64.urlsafe_b64encode(str(doc_id).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    """Decode a cursor from encode_cursor back to a document ID."""
+    try:
+        return int(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode())
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def content_cache_key(prefix: str, content: str, *parts: str) -> str:
+    """Redis key for a result derived from content (plus any extra inputs)."""
+    digest = hashlib.blake2b(content.encode(), digest_size=16).hexdigest()
+    return ":".join((prefix, digest, *parts))
+
+
+async def get_cached_result(key: str, model: Type[ResponseModel]) -> Optional[ResponseModel]:
+    """Return a cached response, or None on a miss or when Redis is unavailable."""
+    try:
+        data = await RedisService.get_client().get(key)
+    except RuntimeError:
+        return None
+    except Exception as e:
+        logger.warning("Result cache read failed for %s: %s", key, e)
+        return None
+    return model.model_validate_json(data) if data else None
+
+
+async def cache_result(key: str, result: BaseModel) -> None:
+    """Store a response for LLM_RESULT_CACHE_TTL seconds."""
+    try:
+        await RedisService.get_client().set(key, result.model_dump_json(), ex=LLM_RESULT_CACHE_TTL)
+    except RuntimeError:
+        pass
+    except Exception as e:
+        logger.warning("Result cache write failed for %s: %s", key, e)
+
+
+async def resolve_target_user(
+    user_id: Optional[int] = Query(None, description="Target user ID (Admin only)"),
+    current_user=Depends(get_current_user),
+) -> int:
+    """Resolve the user whose documents a request acts on; only admins may pick another user."""
+    if user_id is None:
+        return current_user.id
+    if current_user.role != "ADMIN":
+        raise HTTPException(status_code=403, detail="Permission denied")
+    return user_id
 
 
 # =====================
@@ -58,31 +196,35 @@ MAX_FILE_SIZE = 50 * 1024 * 1024
 async def list_documents(
     page: int = Query(1, ge=1, description="Page number"),
     page_size: int = Query(10, ge=1, le=100, description="Documents per page"),
-    user_id: Optional[int] = Query(None, description="Filter by user ID (Admin only)"),
     group_id: Optional[int] = Query(None, description="Filter by group ID"),
-    current_user=Depends(get_current_user),
+    include_total: bool = Query(True, description="Whether to count the total (skip for infinite scroll)"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page; replaces page"),
+    target_user_id: int = Depends(resolve_target_user),
 ):
-    """Get paginated list of user's documents."""
-    try:
-        target_user_id = current_user.id
-        if user_id is not None:
-            if current_user.role != "ADMIN":
-                raise HTTPException(status_code=403, detail="Permission denied")
-            target_user_id = user_id
+    """Get paginated list of user's documents.
 
+    Pages can be addressed by number or, for constant-cost deep paging, by
+    following next_cursor.
+    """
+    try:
+        before_id = decode_cursor(cursor) if cursor else None
         offset = (page - 1) * page_size
         documents, total = await store.get_documents(
-            user_id=target_user_id, limit=page_size, offset=offset, group_id=group_id
-        )
-        total_pages = (total + page_size - 1) // page_size if total > 0 else 0
-
-        return PaginatedDocumentsResponse(
-            documents=documents,
-            total=total,
-            page=page,
-            page_size=page_size,
-            total_pages=total_pages,
+            user_id=target_user_id, limit=page_size, offset=offset, group_id=group_id,
+            include_total=include_total, before_id=before_id,
         )
+        total_pages = ceil_div(total, page_size) if total is not None else None
+        next_cursor = encode_cursor(documents[-1]["id"]) if len(documents) == page_size else None
+
+        # Plain dict: response_model validates and serializes it once
+        return {
+            "documents": documents,
+            "total": total,
+            "page": page,
+            "page_size": page_size,
+            "total_pages": total_pages,
+            "next_cursor": next_cursor,
+        }
     except HTTPException:
         raise
     except Exception as e:
@@ -92,23 +234,17 @@ async def list_documents(
 @router.delete("/documents/batch")
 async def delete_documents_batch(
     data: BatchDeleteInput,
-    user_id: Optional[int] = Query(None, description="Target user ID (Admin only)"),
-    current_user=Depends(get_current_user)
+    background_tasks: BackgroundTasks,
+    target_user_id: int = Depends(resolve_target_user),
 ):
     """Batch delete documents."""
     try:
-        target_user_id = current_user.id
-        if user_id is not None:
-            if current_user.role != "ADMIN":
-                raise HTTPException(status_code=403, detail="Permission denied")
-            target_user_id = user_id
-
-        count = await store.delete_documents(user_id=target_user_id, doc_ids=data.ids)
+        deleted_ids = await store.delete_documents(user_id=target_user_id, doc_ids=data.ids)
 
-        if count > 0:
-            await record_document_delete(prisma, target_user_id, 0)
+        if deleted_ids:
+            background_tasks.add_task(record_documents_delete, prisma, target_user_id, deleted_ids)
 
-        return {"message": f"Successfully deleted {count} documents"}
+        return {"message": f"Successfully deleted {len(deleted_ids)} documents", "deletedIds": deleted_ids}
     except HTTPException:
         raise
     except Exception as e:
@@ -132,24 +268,18 @@ async def get_document(doc_id: int, current_user=Depends(get_current_user)):
 @router.delete("/documents/{doc_id}")
 async def delete_document(
     doc_id: int,
-    user_id: Optional[int] = Query(None, description="Target user ID (Admin only)"),
-    current_user=Depends(get_current_user)
+    background_tasks: BackgroundTasks,
+    target_user_id: int = Depends(resolve_target_user),
 ):
     """Delete a document by ID."""
     try:
-        target_user_id = current_user.id
-        if user_id is not None:
-            if current_user.role != "ADMIN":
-                raise HTTPException(status_code=403, detail="Permission denied")
-            target_user_id = user_id
-
         deleted = await store.delete_document(user_id=target_user_id, doc_id=doc_id)
         if not deleted:
             raise HTTPException(
                 status_code=404, detail="Document not found or permission denied"
             )
 
-        await record_document_delete(prisma, target_user_id, doc_id)
+        background_tasks.add_task(record_document_delete, prisma, target_user_id, doc_id)
         return {"message": "Document deleted successfully"}
     except HTTPException:
         raise
@@ -189,7 +319,9 @@ async def update_document(
 
 
 @router.post("/documents")
-async def add_document(doc: DocumentInput, current_user=Depends(get_chat_user)):
+async def add_document(
+    doc: DocumentInput, background_tasks: BackgroundTasks, current_user=Depends(get_chat_user)
+):
     """Add a new document."""
     try:
         group_id = None
@@ -218,12 +350,60 @@ async def add_document(doc: DocumentInput, current_user=Depends(get_chat_user)):
             user_id=current_user.id, content=doc.content, metadata=doc.metadata, group_id=group_id
         )
 
-        await record_document_add(prisma, current_user.id, doc_id, doc.content[:50])
+        background_tasks.add_task(record_document_add, prisma, current_user.id, doc_id, doc.content[:50])
         return {"id": doc_id, "message": "Document added successfully", "groupId": group_id}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+SMART_CHUNK_SYSTEM_PROMPT = """You are a document segmentation expert. Your task is to analyze the given text and split it into logical, semantic chunks.
+
+Rules:
+1. Each chunk should be a coherent, self-contained unit of information
+2. Split at natural boundaries: topic changes, section headers, logical breaks
+3. Each chunk should be between 200-1500 characters ideally
+4. Preserve complete sentences and paragraphs - never break mid-sentence
+5. Return ONLY a valid JSON array of strings, where each string is a chunk
+6. Do NOT add any explanation, markdown, or other text - ONLY the JSON array
+
+Example output format:
+["First chunk content here...", "Second chunk content here...", "Third chunk content here..."]"""
+
+
+def _llm_smart_chunk(llm: LLMService, content: str) -> Tuple[List[str], bool]:
+    """Ask the LLM to split content into semantic chunks (blocking call).
+
+    Returns:
+        Tuple of (chunks, whether they came from the LLM rather than the
+        fallback chunker because the reply was not a JSON array)
+    """
+    user_prompt = f"""Analyze and split the following document into semantic chunks. Return ONLY a JSON array of chunk strings:
+
+---
+{content}
+---
+
+Remember: Return ONLY the JSON array, no other text."""
+
+    response = llm.chat_completion(
+        query=user_prompt,
+        contexts=[],
+        system_prompt=SMART_CHUNK_SYSTEM_PROMPT,
+        temperature=0.3,
+        max_tokens=4096
+    )
+    
+    response_text = strip_code_fence(response.strip())
+    
+    try:
+        chunks = orjson.loads(response_text)
+        if not isinstance(chunks, list):
+            raise ValueError("Response is not a list")
+        return [str(chunk).strip() for chunk in chunks if str(chunk).strip()], True
+    except (orjson.JSONDecodeError, ValueError):
+        return smart_fallback_chunk(content), False
+
+
 @router.post("/documents/smart-chunk", response_model=SmartChunkResponse)
 async def smart_chunk_document(
     request: SmartChunkRequest,
@@ -244,66 +424,63 @@ async def smart_chunk_document(
         if not content:
             raise HTTPException(status_code=400, detail="Content cannot be empty")
         
-        if len(content) < 100:
+        # Content within the prompt's 200-1500 character chunk size is
+        # already a valid single chunk
+        if len(content) <= config.SMART_CHUNK_MIN_LLM_SIZE:
             return SmartChunkResponse(chunks=[content], chunk_count=1)
         
-        llm = LLMService()
+        cache_key = content_cache_key("smart_chunk", content)
+        cached = await get_cached_result(cache_key, SmartChunkResponse)
+        if cached is not None:
+            return cached
         
-        system_prompt = """You are a document segmentation expert. Your task is to analyze the given text and split it into logical, semantic chunks.
-
-Rules:
-1. Each chunk should be a coherent, self-contained unit of information
-2. Split at natural boundaries: topic changes, section headers, logical breaks
-3. Each chunk should be between 200-1500 characters ideally
-4. Preserve complete sentences and paragraphs - never break mid-sentence
-5. Return ONLY a valid JSON array of strings, where each string is a chunk
-6. Do NOT add any explanation, markdown, or other text - ONLY the JSON array
-
-Example output format:
-["First chunk content here...", "Second chunk content here...", "Third chunk content here..."]"""
-
-        user_prompt = f"""Analyze and split the following document into semantic chunks. Return ONLY a JSON array of chunk strings:
-
----
-{content}
----
-
-Remember: Return ONLY the JSON array, no other text."""
-
-        response = llm.chat_completion(
-            query=user_prompt,
-            contexts=[],
-            system_prompt=system_prompt,
-            temperature=0.3,
-            max_tokens=4096
-        )
-        
-        response_text = response.strip()
-        if response_text.startswith("```"):
-            lines = response_text.split("\n")
-            response_text = "\n".join(lines[1:-1] if lines[-1].startswith("```") else lines[1:])
-        
-        try:
-            chunks = json.loads(response_text)
-            if not isinstance(chunks, list):
-                raise ValueError("Response is not a list")
-            chunks = [str(chunk).strip() for chunk in chunks if str(chunk).strip()]
-        except (json.JSONDecodeError, ValueError):
-            chunks = smart_fallback_chunk(content)
+        if len(content) > SMART_CHUNK_SECTION_THRESHOLD:
+            # Split very long documents into paragraph-aligned sections and
+            # let the LLM refine each section concurrently
+            sections = smart_fallback_chunk(content, SMART_CHUNK_SECTION_SIZE)
+            semaphore = asyncio.Semaphore(SMART_CHUNK_MAX_CONCURRENCY)
+
+            async def chunk_section(section: str) -> Tuple[List[str], bool]:
+                async with semaphore:
+                    return await asyncio.to_thread(_llm_smart_chunk, llm_service, section)
+
+            section_results = await asyncio.gather(*(chunk_section(s) for s in sections))
+            chunks = [chunk for group, _ in section_results for chunk in group]
+            used_llm = all(ok for _, ok in section_results)
+        else:
+            chunks, used_llm = await asyncio.to_thread(_llm_smart_chunk, llm_service, content)
         
         if not chunks:
             chunks = [content]
         
-        return SmartChunkResponse(chunks=chunks, chunk_count=len(chunks))
+        result = SmartChunkResponse(chunks=chunks, chunk_count=len(chunks))
+        # Results where any part fell back to the plain splitter are not
+        # cached, so one unusable LLM reply does not pin them for a day
+        if used_llm:
+            await cache_result(cache_key, result)
+        return result
         
     except HTTPException:
         raise
-    except Exception as e:
-        print(f"Smart chunking error: {e}")
+    except Exception:
+        logger.exception("Smart chunking failed, using fallback chunker")
         chunks = smart_fallback_chunk(request.content)
         return SmartChunkResponse(chunks=chunks, chunk_count=len(chunks))
 
 
+def _split_sentences(text: str) -> List[str]:
+    """Split text after each sentence terminator, keeping the whitespace that follows it."""
+    sentences = []
+    start = 0
+    for match in _SENTENCE_SPLIT_RE.finditer(text):
+        if match.end() > start:
+            sentences.append(text[start:match.end()])
+            start = match.end()
+    if start < len(text):
+        sentences.append(text[start:])
+    return sentences
+
+
 def smart_fallback_chunk(content: str, max_chunk_size: int = 1000) -> List[str]:
     """
     Fallback chunking when LLM fails.
@@ -311,41 +488,44 @@ def smart_fallback_chunk(content: str, max_chunk_size: int = 1000) -> List[str]:
     """
     paragraphs = content.split("\n\n")
     chunks = []
-    current_chunk = ""
+    # Accumulate pieces and join on flush to avoid quadratic string concatenation
+    current_parts: List[str] = []
+    current_len = 0
+
+    def flush():
+        nonlocal current_len
+        if current_parts:
+            # A chunk cut between sentences ends with that sentence's trailing whitespace
+            chunks.append("".join(current_parts).rstrip())
+            current_parts.clear()
+            current_len = 0
 
     for para in paragraphs:
         para = para.strip()
         if not para:
             continue
 
-        if len(current_chunk) + len(para) + 2 <= max_chunk_size:
-            if current_chunk:
-                current_chunk += "\n\n" + para
-            else:
-                current_chunk = para
+        if current_len + len(para) + 2 <= max_chunk_size:
+            if current_parts:
+                current_parts.append("\n\n")
+                current_len += 2
+            current_parts.append(para)
+            current_len += len(para)
         else:
-            if current_chunk:
-                chunks.append(current_chunk)
+            flush()
             if len(para) <= max_chunk_size:
-                current_chunk = para
+                current_parts.append(para)
+                current_len = len(para)
             else:
-                sentences = para.replace(". ", ".|").split("|")
-                for sentence in sentences:
-                    sentence = sentence.strip()
-                    if not sentence:
-                        continue
-                    if len(current_chunk) + len(sentence) + 1 <= max_chunk_size:
-                        if current_chunk:
-                            current_chunk += " " + sentence
-                        else:
-                            current_chunk = sentence
-                    else:
-                        if current_chunk:
-                            chunks.append(current_chunk)
-                        current_chunk = sentence
-
-    if current_chunk:
-        chunks.append(current_chunk)
+                # Sentences keep their own trailing whitespace, so joining
+                # them restores the paragraph exactly (CJK text stays unspaced)
+                for sentence in _split_sentences(para):
+                    if current_len + len(sentence) > max_chunk_size:
+                        flush()
+                    current_parts.append(sentence)
+                    current_len += len(sentence)
+
+    flush()
 
     return chunks if chunks else [content]
 
@@ -366,12 +546,50 @@ async def fact_check_document(
         if not content:
             raise HTTPException(status_code=400, detail="Content cannot be empty")
 
+        # 获取当前时间信息
+        current_time_str = request.current_time or datetime.utcnow().isoformat() + "Z"
+        # 解析ISO时间获取可读格式
+        try:
+            dt = datetime.fromisoformat(current_time_str.replace("Z", "+00:00"))
+            readable_date = dt.strftime("%Y年%m月%d日")
+        except:
+            readable_date = "2025年12月"
+
+        # The verdict depends on the content and the date it is judged on
+        cache_key = content_cache_key("fact_check", content, readable_date)
+        cached = await get_cached_result(cache_key, FactCheckResponse)
+        if cached is not None:
+            return cached
+
+        # Both LLM prompts see the same leading excerpt of the document
+        excerpt = content[:2000]
+
+        # Keyword fallback query, used if the LLM yields no claims
+        words = content.split()
+        if len(words) <= 10:
+            fallback_queries = [content]
+        else:
+            # Use first sentence or first 100 chars
+            first_sentence = (
+                content.split(".")[0][:100] if "." in content else content[:100]
+            )
+            fallback_queries = [first_sentence.strip()]
+
+        def search_exa(query: str):
+            # search_with_exa is a blocking HTTP call; run it in a thread
+            return asyncio.to_thread(
+                mcp_client.search_with_exa,
+                query=query,
+                num_results=3,
+                livecrawl="fallback",
+                search_type="auto",
+                context_max_characters=5000,
+            )
+
         # Extract key claims from the content for searching
         search_queries = []
 
         try:
-            llm = LLMService()
-
             # First, extract searchable claims from the document
             extract_prompt = """Extract the main factual claims from the following text that can be verified through web search.
 Return ONLY a JSON array of 1-5 short search queries (each under 100 chars) that would help verify these claims.
@@ -382,104 +600,77 @@ Example output format:
 
 If the text contains no verifiable factual claims, return: ["general topic of the text"]"""
 
-            claims_response = llm.chat_completion(
-                query=f"Text to analyze:\n\n{content[:2000]}",
+            claims_response = await asyncio.to_thread(
+                llm_service.chat_completion,
+                query=f"Text to analyze:\n\n{excerpt}",
                 contexts=[],
                 system_prompt=extract_prompt,
                 temperature=0.2,
-                max_tokens=10000,
+                max_tokens=512,
             )
 
             # Parse the search queries
-            claims_text = claims_response.strip()
-            if claims_text.startswith("```"):
-                lines = claims_text.split("\n")
-                claims_text = "\n".join(
-                    lines[1:-1] if lines[-1].startswith("```") else lines[1:]
-                )
-            search_queries = json.loads(claims_text)
+            claims_text = strip_code_fence(claims_response.strip())
+            search_queries = orjson.loads(claims_text)
             if not isinstance(search_queries, list):
                 search_queries = []
         except Exception as llm_error:
-            print(f"LLM extraction failed: {llm_error}")
-            # Fallback: extract simple keywords manually
+            logger.warning("LLM extraction failed: %s", llm_error)
             search_queries = []
 
-        # Fallback: use content snippet if no queries extracted
-        if not search_queries:
-            # Simple keyword extraction fallback
-            words = content.split()
-            if len(words) <= 10:
-                search_queries = [content]
-            else:
-                # Use first sentence or first 100 chars
-                first_sentence = (
-                    content.split(".")[0][:100] if "." in content else content[:100]
-                )
-                search_queries = [first_sentence.strip()]
-
         # Search for each claim using Exa
         all_sources: List[FactCheckSource] = []
         search_results_text = []
 
-        try:
-            mcp_client = MCPClient()
-
-            for query in search_queries[:3]:  # Limit to 3 searches
-                try:
-                    results = mcp_client.search_with_exa(
-                        query=query,
-                        num_results=3,
-                        livecrawl="fallback",
-                        search_type="auto",
-                        context_max_characters=5000,
-                    )
-
-                    for result in results:
-                        if isinstance(result, dict):
-                            text = result.get("text", "")
-                            # Try to extract URL and title from the result
-                            url = result.get("url", "")
-                            title = result.get("title", query[:50])
-
-                            if text:
-                                snippet = (
-                                    text[:500] + "..." if len(text) > 500 else text
-                                )
-                                all_sources.append(
-                                    FactCheckSource(
-                                        title=title or "Source",
-                                        url=url or "",
-                                        snippet=snippet,
-                                    )
-                                )
-                                search_results_text.append(
-                                    f"Source: {title}\n{text[:1000]}"
-                                )
-                except Exception as search_error:
-                    print(f"Search error for query '{query}': {search_error}")
-                    continue
-
-        except Exception as mcp_error:
-            print(f"MCP client error: {mcp_error}")
-            # Return unverified result if search fails
-            return FactCheckResponse(
-                credibility_score=50,
-                verdict="unverified",
-                analysis="Unable to verify: Web search service is currently unavailable. The content could not be fact-checked against online sources.",
-                sources=[],
-                claims_checked=0,
+        if search_queries:
+            queries = search_queries[:3]  # Limit to 3 searches
+            # The searches are independent; the total wait is the slowest one
+            search_results = await asyncio.gather(
+                *[search_exa(query) for query in queries],
+                return_exceptions=True,
+            )
+        else:
+            search_queries = queries = fallback_queries
+            # Only searched once extraction gave nothing, so the common path
+            # makes no extra paid Exa call
+            search_results = await asyncio.gather(
+                search_exa(fallback_queries[0]),
+                return_exceptions=True,
             )
 
-        # Remove duplicate sources
-        seen_snippets = set()
-        unique_sources = []
+        for query, results in zip(queries, search_results):
+            if isinstance(results, Exception):
+                logger.warning("Search error for query '%s': %s", query, results)
+                continue
+
+            for result in results:
+                if isinstance(result, dict):
+                    text = result.get("text", "")
+                    # Try to extract URL and title from the result
+                    url = result.get("url", "")
+                    title = result.get("title", query[:50])
+
+                    if text:
+                        text_head = text[:1000]
+                        snippet = (
+                            text_head[:500] + "..." if len(text) > 500 else text
+                        )
+                        all_sources.append(
+                            FactCheckSource(
+                                title=title or "Source",
+                                url=url or "",
+                                snippet=snippet,
+                            )
+                        )
+                        search_results_text.append(
+                            f"Source: {title}\n{text_head}"
+                        )
+
+        # Remove duplicate sources (first occurrence wins, order is kept)
+        unique_sources = {}
         for source in all_sources:
-            snippet_key = source.snippet[:100]
-            if snippet_key not in seen_snippets:
-                seen_snippets.add(snippet_key)
-                unique_sources.append(source)
-        all_sources = unique_sources[:5]  # Limit to 5 sources
+            unique_sources.setdefault(source.snippet[:100], source)
+        all_sources = list(unique_sources.values())[:5]  # Limit to 5 sources
 
         # Analyze credibility using LLM
         if not search_results_text:
@@ -491,15 +682,6 @@ If the text contains no verifiable factual claims, return: ["general topic of th
                 claims_checked=len(search_queries),
             )
 
-        # 获取当前时间信息
-        current_time_str = request.current_time or datetime.utcnow().isoformat() + "Z"
-        # 解析ISO时间获取可读格式
-        try:
-            dt = datetime.fromisoformat(current_time_str.replace("Z", "+00:00"))
-            readable_date = dt.strftime("%Y年%m月%d日")
-        except:
-            readable_date = "2025年12月"
-
         analysis_prompt = """You are a fact-checking expert. Analyze the following document against the search results and determine its credibility.
 
 CRITICAL: Today's date is {readable_date} (from user's browser: {current_time}). You MUST use this date when evaluating the timeliness of sources and claims.
@@ -530,23 +712,21 @@ Search results from web:
 ---"""
 
         try:
-            llm_service = LLMService()
-            analysis_response = llm_service.chat_completion(
+            analysis_response = await asyncio.to_thread(
+                llm_service.chat_completion,
                 query=analysis_prompt.format(
                     readable_date=readable_date,
                     current_time=current_time_str,
-                    document=content[:2000],
+                    document=excerpt,
                     sources="\n\n".join(search_results_text[:3]),
                 ),
                 contexts=[],
                 system_prompt=f"You are a professional fact-checker. Today's date is {readable_date}. Respond only with valid JSON.",
                 temperature=0.3,
-                max_tokens=1000,
+                max_tokens=512,
             )
-        except Exception as analysis_error:
-            print(f"LLM analysis API failed: {analysis_error}")
-            import traceback
-            traceback.print_exc()
+        except Exception:
+            logger.exception("LLM analysis API failed")
             # Return partial result with sources but no AI analysis
             return FactCheckResponse(
                 credibility_score=50,
@@ -561,29 +741,21 @@ Search results from web:
             analysis_text = analysis_response.strip()
 
             # Remove markdown code blocks if present
-            if analysis_text.startswith("```"):
-                lines = analysis_text.split("\n")
-                # Remove first and last lines if they are code fence markers
-                if lines[0].startswith("```"):
-                    lines = lines[1:]
-                if lines and lines[-1].strip().startswith("```"):
-                    lines = lines[:-1]
-                analysis_text = "\n".join(lines)
+            analysis_text = strip_code_fence(analysis_text)
 
             # Try to extract JSON object from the response
             # Handle case where LLM adds extra text before/after JSON
-            import re
             # Find JSON object that contains credibility_score
-            json_match = re.search(r'\{[\s\S]*?"credibility_score"[\s\S]*?"verdict"[\s\S]*?"analysis"[\s\S]*?\}', analysis_text)
+            json_match = _CREDIBILITY_JSON_RE.search(analysis_text)
             if json_match:
                 analysis_text = json_match.group()
             else:
                 # Try simpler match for any JSON-like object
-                json_match = re.search(r'\{[^{}]+\}', analysis_text)
+                json_match = _FLAT_JSON_RE.search(analysis_text)
                 if json_match:
                     analysis_text = json_match.group()
 
-            analysis_data = json.loads(analysis_text)
+            analysis_data = orjson.loads(analysis_text)
 
             credibility_score = int(analysis_data.get("credibility_score", 50))
             credibility_score = max(0, min(100, credibility_score))
@@ -599,25 +771,31 @@ Search results from web:
                 verdict = "unverified"
 
             analysis = analysis_data.get("analysis", "Analysis could not be generated.")
+            analysis_parsed = True
 
-        except (json.JSONDecodeError, ValueError, KeyError) as e:
-            print(f"Failed to parse analysis response: {e}")
+        except (orjson.JSONDecodeError, ValueError, KeyError) as e:
+            logger.warning("Failed to parse analysis response: %s", e)
             credibility_score = 50
             verdict = "unverified"
             analysis = "Unable to complete credibility analysis. Please try again."
+            analysis_parsed = False
 
-        return FactCheckResponse(
+        result = FactCheckResponse(
             credibility_score=credibility_score,
             verdict=verdict,
             analysis=analysis,
             sources=all_sources,
             claims_checked=len(search_queries),
         )
+        # Only complete verdicts are cached; failures should be retried
+        if analysis_parsed:
+            await cache_result(cache_key, result)
+        return result
 
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Fact check error: {e}")
+        logger.exception("Fact check error")
         raise HTTPException(status_code=500, detail=f"Fact check failed: {str(e)}")
 
 
@@ -644,13 +822,14 @@ async def knowledge_check_document(
         distance_threshold = 1.0 - user_similarity
 
         # Search for related documents in user's knowledge base
-        results, total = await store.search(
+        results, _ = await store.search(
             user_id=current_user.id,
             query=content[:1000],  # Use first 1000 chars as search query
             threshold=distance_threshold,
             limit=5,
             offset=0,
             group_id=request.group_id,
+            include_total=False,
         )
 
         # Build sources from search results
@@ -721,7 +900,6 @@ Related documents from knowledge base:
 ---"""
 
         try:
-            llm_service = LLMService()
             analysis_response = llm_service.chat_completion(
                 query=analysis_prompt.format(
                     content=content[:2000],
@@ -732,10 +910,8 @@ Related documents from knowledge base:
                 temperature=0.3,
                 max_tokens=1000,
             )
-        except Exception as analysis_error:
-            print(f"LLM analysis API failed: {analysis_error}")
-            import traceback
-            traceback.print_exc()
+        except Exception:
+            logger.exception("LLM analysis API failed")
             return KnowledgeCheckResponse(
                 consistency_score=50,
                 verdict="no_reference",
@@ -749,25 +925,18 @@ Related documents from knowledge base:
             analysis_text = analysis_response.strip()
 
             # Remove markdown code blocks if present
-            if analysis_text.startswith("```"):
-                lines = analysis_text.split("\n")
-                if lines[0].startswith("```"):
-                    lines = lines[1:]
-                if lines and lines[-1].strip().startswith("```"):
-                    lines = lines[:-1]
-                analysis_text = "\n".join(lines)
+            analysis_text = strip_code_fence(analysis_text)
 
             # Try to extract JSON object from the response
-            import re
-            json_match = re.search(r'\{[\s\S]*?"consistency_score"[\s\S]*?"verdict"[\s\S]*?"analysis"[\s\S]*?\}', analysis_text)
+            json_match = _CONSISTENCY_JSON_RE.search(analysis_text)
             if json_match:
                 analysis_text = json_match.group()
             else:
-                json_match = re.search(r'\{[^{}]+\}', analysis_text)
+                json_match = _FLAT_JSON_RE.search(analysis_text)
                 if json_match:
                     analysis_text = json_match.group()
 
-            analysis_data = json.loads(analysis_text)
+            analysis_data = orjson.loads(analysis_text)
 
             consistency_score = int(analysis_data.get("consistency_score", 50))
             consistency_score = max(0, min(100, consistency_score))
@@ -784,8 +953,8 @@ Related documents from knowledge base:
 
             analysis = analysis_data.get("analysis", "Analysis could not be generated.")
 
-        except (json.JSONDecodeError, ValueError, KeyError) as e:
-            print(f"Failed to parse analysis response: {e}")
+        except (orjson.JSONDecodeError, ValueError, KeyError) as e:
+            logger.warning("Failed to parse analysis response: %s", e)
             consistency_score = 50
             verdict = "no_reference"
             analysis = "Unable to complete consistency analysis. Please try again."
@@ -801,45 +970,100 @@ Related documents from knowledge base:
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Knowledge check error: {e}")
+        logger.exception("Knowledge check error")
         raise HTTPException(status_code=500, detail=f"Knowledge check failed: {str(e)}")
 
 
-@router.post("/documents/parse")
-async def parse_document(
-    file: UploadFile = File(...),
-    current_user=Depends(get_chat_user)
-):
-    """Parse a document file and return extracted text content."""
+def validate_upload(file: UploadFile) -> str:
+    """Reject unsupported or oversized uploads before reading the file body.
+
+    Returns the upload's filename.
+    """
+    filename = file.filename or "unknown"
+    if not FileParser.is_supported(filename):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported file type. Supported: {FileParser.SUPPORTED_EXTENSIONS_LABEL}"
+        )
+    
+    if not FileParser.is_content_type_allowed(filename, file.content_type):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Content type '{file.content_type}' does not match the file extension"
+        )
+    
+    # Oversized bodies that declare a Content-Length are already rejected by
+    # UploadSizeLimitMiddleware in api.py, before the body is received.
+    if file.size is not None and file.size > MAX_FILE_SIZE:
+        raise HTTPException(status_code=413, detail=FILE_TOO_LARGE_DETAIL)
+    
+    return filename
+
+
+def _copy_upload(src: BinaryIO, path: str) -> int:
+    """Copy a spooled upload to path in chunks (blocking call).
+
+    Returns:
+        Number of bytes copied, or MAX_FILE_SIZE + 1 once the upload turns
+        out to be over the limit, in which case copying stops
+    """
+    size = 0
+    with open(path, "wb") as out:
+        while chunk := src.read(UPLOAD_CHUNK_SIZE):
+            size += len(chunk)
+            if size > MAX_FILE_SIZE:
+                return MAX_FILE_SIZE + 1
+            out.write(chunk)
+    return size
+
+
+async def extract_upload_text(file: UploadFile, filename: str) -> Tuple[str, int]:
+    """Copy an upload to a temp file and parse it in a worker process.
+
+    Starlette has already received and spooled the whole multipart body by
+    the time the route runs, so an oversized body is only stopped before
+    that by the Content-Length check in api.py. The copy just gives the
+    parse worker a path to open, and runs in a thread to keep the file I/O
+    off the event loop.
+
+    Returns:
+        Tuple of (extracted text, file size in bytes)
+    """
+    with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(filename)[1]) as tmp:
+        path = tmp.name
     try:
-        filename = file.filename or "unknown"
-        if not FileParser.is_supported(filename):
-            raise HTTPException(
-                status_code=400,
-                detail=f"Unsupported file type. Supported: {', '.join(sorted(FileParser.SUPPORTED_EXTENSIONS))}"
-            )
-        
-        file_bytes = await file.read()
-        
-        if len(file_bytes) > MAX_FILE_SIZE:
-            raise HTTPException(
-                status_code=400,
-                detail=f"File too large. Maximum size is {MAX_FILE_SIZE // (1024 * 1024)}MB"
-            )
+        size = await asyncio.to_thread(_copy_upload, file.file, path)
+        if size > MAX_FILE_SIZE:
+            raise HTTPException(status_code=413, detail=FILE_TOO_LARGE_DETAIL)
         
-        if len(file_bytes) == 0:
+        if size == 0:
             raise HTTPException(status_code=400, detail="File is empty")
         
         try:
-            content = FileParser.parse_file(filename, file_bytes)
+            content = await parse_path_async(filename, path)
         except FileParseError as e:
             raise HTTPException(status_code=400, detail=str(e))
-        
-        if not content or not content.strip():
-            raise HTTPException(
-                status_code=400,
-                detail="No text content could be extracted from the file"
-            )
+    finally:
+        os.unlink(path)
+    
+    if not content or not content.strip():
+        raise HTTPException(
+            status_code=400,
+            detail="No text content could be extracted from the file"
+        )
+    
+    return content, size
+
+
+@router.post("/documents/parse")
+async def parse_document(
+    file: UploadFile = File(...),
+    current_user=Depends(get_chat_user)
+):
+    """Parse a document file and return extracted text content."""
+    try:
+        filename = validate_upload(file)
+        content, _ = await extract_upload_text(file, filename)
         
         return {
             "content": content,
@@ -855,6 +1079,7 @@ async def parse_document(
 
 @router.post("/documents/upload")
 async def upload_document(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     group_id: Optional[int] = Form(None),
     group_name: Optional[str] = Form(None),
@@ -864,39 +1089,27 @@ async def upload_document(
 ):
     """Upload a document file (PDF, DOCX, TXT, MD) and extract text content."""
     try:
-        filename = file.filename or "unknown"
-        if not FileParser.is_supported(filename):
-            raise HTTPException(
-                status_code=400,
-                detail=f"Unsupported file type. Supported: {', '.join(sorted(FileParser.SUPPORTED_EXTENSIONS))}"
-            )
-        
-        file_bytes = await file.read()
+        filename = validate_upload(file)
         
-        if len(file_bytes) > MAX_FILE_SIZE:
-            raise HTTPException(
-                status_code=400,
-                detail=f"File too large. Maximum size is {MAX_FILE_SIZE // (1024 * 1024)}MB"
+        # Look the group up while the file is parsed; it is only created once
+        # parsing succeeds, so a failed upload never leaves an empty group
+        group_lookup = None
+        if group_id is None and group_name and group_name.strip():
+            group_lookup = asyncio.create_task(
+                store.resolve_group_id(current_user.id, group_name.strip())
             )
         
-        if len(file_bytes) == 0:
-            raise HTTPException(status_code=400, detail="File is empty")
-        
         try:
-            content = FileParser.parse_file(filename, file_bytes)
-        except FileParseError as e:
-            raise HTTPException(status_code=400, detail=str(e))
-        
-        if not content or not content.strip():
-            raise HTTPException(
-                status_code=400,
-                detail="No text content could be extracted from the file"
-            )
+            content, file_size = await extract_upload_text(file, filename)
+        except BaseException:
+            if group_lookup is not None:
+                group_lookup.cancel()
+            raise
         
         metadata = {
             "originalFilename": filename,
             "fileType": filename.rsplit('.', 1)[-1].lower() if '.' in filename else "unknown",
-            "fileSize": len(file_bytes),
+            "fileSize": file_size,
         }
         
         if category and category.strip():
@@ -904,19 +1117,19 @@ async def upload_document(
         if source and source.strip():
             metadata["source"] = source.strip()
         
-        resolved_group_id = None
-        if group_id is not None:
-            resolved_group_id = group_id
-        elif group_name and group_name.strip():
-            resolved_group_id = await store.find_or_create_group(
-                user_id=current_user.id, name=group_name.strip()
-            )
+        resolved_group_id = group_id
+        if group_lookup is not None:
+            resolved_group_id = await group_lookup
+            if resolved_group_id is None:
+                resolved_group_id = await store.find_or_create_group(
+                    user_id=current_user.id, name=group_name.strip()
+                )
         
         doc_id = await store.add_document(
             user_id=current_user.id, content=content, metadata=metadata, group_id=resolved_group_id
         )
         
-        await record_document_add(prisma, current_user.id, doc_id, content[:50])
+        background_tasks.add_task(record_document_add, prisma, current_user.id, doc_id, content[:50])
         
         return {
             "id": doc_id,
@@ -936,38 +1149,30 @@ async def upload_document(
 # =====================
 
 
-@router.get("/groups", response_model=List[DocumentGroup])
-async def list_groups(current_user=Depends(get_current_user)):
+@router.get("/groups", responses={200: {"model": List[DocumentGroup]}})
+async def list_groups(request: Request, response: Response, current_user=Depends(get_current_user)):
     """Get all document groups for the current user."""
-    try:
-        return await store.get_groups(user_id=current_user.id)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    groups = await store.get_groups(user_id=current_user.id)
+    etag = compute_etag(groups)
+    if is_not_modified(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return groups
 
 
-@router.post("/groups", response_model=DocumentGroup)
+@router.post("/groups", responses={200: {"model": DocumentGroup}})
 async def create_group(group: DocumentGroupInput, current_user=Depends(get_current_user)):
     """Create a new document group."""
-    try:
-        return await store.create_group(user_id=current_user.id, name=group.name)
-    except Exception as e:
-        if "Unique constraint failed" in str(e):
-            raise HTTPException(status_code=400, detail="Group with this name already exists")
-        raise HTTPException(status_code=500, detail=str(e))
+    return await store.create_group(user_id=current_user.id, name=group.name)
 
 
-@router.put("/groups/{group_id}", response_model=DocumentGroup)
+@router.put("/groups/{group_id}", responses={200: {"model": DocumentGroup}})
 async def update_group(group_id: int, group: DocumentGroupInput, current_user=Depends(get_current_user)):
     """Update a document group."""
-    try:
-        result = await store.update_group(user_id=current_user.id, group_id=group_id, name=group.name)
-        if not result:
-            raise HTTPException(status_code=404, detail="Group not found")
-        return result
-    except Exception as e:
-        if "Unique constraint failed" in str(e):
-            raise HTTPException(status_code=400, detail="Group with this name already exists")
-        raise HTTPException(status_code=500, detail=str(e))
+    result = await store.update_group(user_id=current_user.id, group_id=group_id, name=group.name)
+    if not result:
+        raise HTTPException(status_code=404, detail="Group not found")
+    return result
 
 
 @router.delete("/groups/{group_id}")
@@ -1007,7 +1212,8 @@ async def export_group(
     """Export a document group."""
     try:
         export_data = await store.export_group(
-            user_id=current_user.id, group_id=group_id, include_vectors=request.include_vectors
+            user_id=current_user.id, group_id=group_id, include_vectors=request.include_vectors,
+            vector_dtype=request.vector_dtype,
         )
         if not export_data:
             raise HTTPException(status_code=404, detail="Group not found")
@@ -1016,6 +1222,23 @@ async def export_group(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/groups/{group_id}/export/stream")
+async def export_group_stream(
+    group_id: int, request: GroupExportRequest, current_user=Depends(get_current_user)
+):
+    """Export a document group as NDJSON (a header line, then one line per document)."""
+    try:
+        lines = await store.export_group_stream(
+            user_id=current_user.id, group_id=group_id, include_vectors=request.include_vectors,
+            vector_dtype=request.vector_dtype,
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if lines is None:
+        raise HTTPException(status_code=404, detail="Group not found")
+    return StreamingResponse(lines, media_type="application/x-ndjson")
+
+
 @router.post("/groups/import")
 async def import_group(request: GroupImportRequest, current_user=Depends(get_current_user)):
     """Import a document group."""
@@ -1050,28 +1273,27 @@ async def import_group(request: GroupImportRequest, current_user=Depends(get_cur
 # =====================
 
 
-@router.get("/search", response_model=PaginatedSearchResponse)
+@router.get("/search", responses={200: {"model": PaginatedSearchResponse}})
 async def search_documents(
     query: str,
+    background_tasks: BackgroundTasks,
     page: int = Query(1, ge=1, description="Page number"),
     page_size: int = Query(5, ge=1, le=50, description="Results per page"),
     group_id: Optional[int] = Query(None, description="Filter by group ID (optional)"),
     group_name: Optional[str] = Query(None, description="Filter by group name (optional)"),
+    include_total: bool = Query(True, description="Whether to count all matches (skip for infinite scroll)"),
     current_user=Depends(get_chat_user),
 ):
     """Search documents with optional group filtering."""
     try:
         resolved_group_id = group_id
         if group_name and not group_id:
-            group = await prisma.documentgroup.find_first(
-                where={"userId": current_user.id, "name": group_name}
-            )
-            if group:
-                resolved_group_id = group.id
-            else:
-                return PaginatedSearchResponse(
-                    results=[], total=0, page=page, page_size=page_size, total_pages=0
-                )
+            resolved_group_id = await store.resolve_group_id(current_user.id, group_name)
+            if resolved_group_id is None:
+                return {
+                    "results": [], "total": 0, "page": page, "page_size": page_size, "total_pages": 0,
+                    "has_more": False,
+                }
 
         offset = (page - 1) * page_size
         user_similarity = (
@@ -1083,17 +1305,28 @@ async def search_documents(
             user_id=current_user.id,
             query=query,
             threshold=distance_threshold,
-            limit=page_size,
+            # Without a count, one extra row tells whether another page exists
+            limit=page_size if include_total else page_size + 1,
             offset=offset,
             group_id=resolved_group_id,
+            include_total=include_total,
         )
-        total_pages = (total + page_size - 1) // page_size if total > 0 else 0
-
-        await record_search(prisma, current_user.id, query, total)
+        if total is not None:
+            total_pages = ceil_div(total, page_size)
+            has_more = offset + len(results) < total
+        else:
+            total_pages = None
+            has_more = len(results) > page_size
+            results = results[:page_size]
 
-        return PaginatedSearchResponse(
-            results=results, total=total, page=page, page_size=page_size, total_pages=total_pages
+        background_tasks.add_task(
+            record_search, prisma, current_user.id, query, total if total is not None else len(results)
         )
+
+        return {
+            "results": results, "total": total, "page": page, "page_size": page_size,
+            "total_pages": total_pages, "has_more": has_more,
+        }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -1114,14 +1347,16 @@ async def get_stats(current_user=Depends(get_current_user)):
 
 
 @router.delete("/api/documents/{doc_id}")
-async def api_delete_document(doc_id: int, current_user=Depends(get_chat_user)):
+async def api_delete_document(
+    doc_id: int, background_tasks: BackgroundTasks, current_user=Depends(get_chat_user)
+):
     """Delete a document by ID (supports API Key authentication)."""
     try:
         deleted = await store.delete_document(user_id=current_user.id, doc_id=doc_id)
         if not deleted:
             raise HTTPException(status_code=404, detail="Document not found or permission denied")
 
-        await record_document_delete(prisma, current_user.id, doc_id)
+        background_tasks.add_task(record_document_delete, prisma, current_user.id, doc_id)
         return {"message": "Document deleted successfully", "id": doc_id}
     except HTTPException:
         raise
@@ -1130,13 +1365,19 @@ async def api_delete_document(doc_id: int, current_user=Depends(get_chat_user)):
 
 
 @router.delete("/api/documents/batch")
-async def api_delete_documents_batch(data: BatchDeleteApiInput, current_user=Depends(get_chat_user)):
+async def api_delete_documents_batch(
+    data: BatchDeleteApiInput, background_tasks: BackgroundTasks, current_user=Depends(get_chat_user)
+):
     """Batch delete documents by IDs (supports API Key authentication)."""
     try:
-        count = await store.delete_documents(user_id=current_user.id, doc_ids=data.ids)
-        if count > 0:
-            await record_document_delete(prisma, current_user.id, 0)
-        return {"message": f"Successfully deleted {count} documents", "deletedCount": count}
+        deleted_ids = await store.delete_documents(user_id=current_user.id, doc_ids=data.ids)
+        if deleted_ids:
+            background_tasks.add_task(record_documents_delete, prisma, current_user.id, deleted_ids)
+        return {
+            "message": f"Successfully deleted {len(deleted_ids)} documents",
+            "deletedCount": len(deleted_ids),
+            "deletedIds": deleted_ids,
+        }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -1149,21 +1390,21 @@ async def api_move_document(doc_id: int, data: MoveDocumentInput, current_user=D
         
         if data.group_id is not None:
             target_group_id = data.group_id
-            group = await prisma.documentgroup.find_first(
-                where={"id": target_group_id, "userId": current_user.id}
-            )
-            if not group:
-                raise HTTPException(status_code=404, detail="Target group not found")
         elif data.group_name is not None and data.group_name.strip():
             target_group_id = await store.find_or_create_group(
                 user_id=current_user.id, name=data.group_name.strip()
             )
         
-        result = await store.update_document(
-            user_id=current_user.id, doc_id=doc_id, group_id=target_group_id, update_group=True
-        )
+        # Group ownership is verified by the UPDATE; only look it up to explain a failure
+        result = await store.move_document(user_id=current_user.id, doc_id=doc_id, group_id=target_group_id)
         
         if not result:
+            if data.group_id is not None:
+                group = await prisma.documentgroup.find_first(
+                    where={"id": target_group_id, "userId": current_user.id}
+                )
+                if not group:
+                    raise HTTPException(status_code=404, detail="Target group not found")
             raise HTTPException(status_code=404, detail="Document not found")
         
         return {"message": "Document moved successfully", "document": result}
@@ -1199,89 +1440,83 @@ async def api_update_document(doc_id: int, data: DocumentUpdateInput, current_us
 
 
 @router.get("/api/stats")
-async def api_get_stats(current_user=Depends(get_chat_user)):
+async def api_get_stats(request: Request, response: Response, current_user=Depends(get_chat_user)):
     """Get user statistics (supports API Key authentication)."""
     try:
-        total_documents = await store.get_total_documents(user_id=current_user.id)
-        groups = await store.get_groups(user_id=current_user.id)
-        return {"totalDocuments": total_documents, "totalGroups": len(groups), "groups": groups}
+        # Both are served from the per-user Redis cache when warm
+        total_documents, groups = await asyncio.gather(
+            store.get_total_documents(user_id=current_user.id),
+            store.get_groups(user_id=current_user.id),
+        )
+        stats = {"totalDocuments": total_documents, "totalGroups": len(groups), "groups": groups}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    
+    etag = compute_etag(stats)
+    if is_not_modified(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return stats
 
 
-@router.get("/api/groups", response_model=List[DocumentGroup])
-async def api_list_groups(current_user=Depends(get_chat_user)):
+@router.get("/api/groups", responses={200: {"model": List[DocumentGroup]}})
+async def api_list_groups(request: Request, response: Response, current_user=Depends(get_chat_user)):
     """Get all document groups (supports API Key authentication)."""
-    try:
-        return await store.get_groups(user_id=current_user.id)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    groups = await store.get_groups(user_id=current_user.id)
+    etag = compute_etag(groups)
+    if is_not_modified(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return groups
 
 
-@router.post("/api/groups", response_model=DocumentGroup)
+@router.post("/api/groups", responses={200: {"model": DocumentGroup}})
 async def api_create_group(group: DocumentGroupInput, current_user=Depends(get_chat_user)):
     """Create a new document group (supports API Key authentication)."""
-    try:
-        return await store.create_group(user_id=current_user.id, name=group.name)
-    except Exception as e:
-        if "Unique constraint failed" in str(e):
-            raise HTTPException(status_code=400, detail="Group with this name already exists")
-        raise HTTPException(status_code=500, detail=str(e))
+    return await store.create_group(user_id=current_user.id, name=group.name)
 
 
-@router.put("/api/groups/{group_id}", response_model=DocumentGroup)
+@router.put("/api/groups/{group_id}", responses={200: {"model": DocumentGroup}})
 async def api_update_group(group_id: int, group: DocumentGroupInput, current_user=Depends(get_chat_user)):
     """Update a document group by ID (supports API Key authentication)."""
-    try:
-        result = await store.update_group(user_id=current_user.id, group_id=group_id, name=group.name)
-        if not result:
-            raise HTTPException(status_code=404, detail="Group not found")
-        return result
-    except HTTPException:
-        raise
-    except Exception as e:
-        if "Unique constraint failed" in str(e):
-            raise HTTPException(status_code=400, detail="Group with this name already exists")
-        raise HTTPException(status_code=500, detail=str(e))
+    result = await store.update_group(user_id=current_user.id, group_id=group_id, name=group.name)
+    if not result:
+        raise HTTPException(status_code=404, detail="Group not found")
+    return result
 
 
-@router.put("/api/groups/by-name/{group_name}", response_model=DocumentGroup)
+@router.put("/api/groups/by-name/{group_name}", responses={200: {"model": DocumentGroup}})
 async def api_update_group_by_name(
     group_name: str, group: DocumentGroupInput, current_user=Depends(get_chat_user)
 ):
     """Update a document group by name (supports API Key authentication)."""
-    try:
-        existing = await prisma.documentgroup.find_first(
-            where={"userId": current_user.id, "name": group_name}
-        )
-        if not existing:
-            raise HTTPException(status_code=404, detail=f"Group '{group_name}' not found")
-        
-        result = await store.update_group(user_id=current_user.id, group_id=existing.id, name=group.name)
-        if not result:
-            raise HTTPException(status_code=404, detail="Group not found")
-        return result
-    except HTTPException:
-        raise
-    except Exception as e:
-        if "Unique constraint failed" in str(e):
-            raise HTTPException(status_code=400, detail="Group with this name already exists")
-        raise HTTPException(status_code=500, detail=str(e))
+    result = await store.update_group_by_name(
+        user_id=current_user.id, name=group_name, new_name=group.name
+    )
+    if not result:
+        raise HTTPException(status_code=404, detail=f"Group '{group_name}' not found")
+    return result
 
 
 @router.get("/api/groups/by-name/{group_name}/documents")
-async def api_list_documents_by_group_name(group_name: str, current_user=Depends(get_chat_user)):
-    """List all documents in a group by group name (supports API Key authentication)."""
+async def api_list_documents_by_group_name(
+    group_name: str,
+    limit: int = Query(100, ge=1, le=1000, description="Documents per page"),
+    offset: int = Query(0, ge=0, description="Number of documents to skip"),
+    current_user=Depends(get_chat_user),
+):
+    """List documents in a group by group name, paginated (supports API Key authentication)."""
     try:
-        documents, group_id = await store.get_documents_by_group_name(
-            user_id=current_user.id, group_name=group_name
+        documents, group_id, total = await store.get_documents_by_group_name(
+            user_id=current_user.id, group_name=group_name, limit=limit, offset=offset
         )
         
         if group_id is None:
             raise HTTPException(status_code=404, detail=f"Group '{group_name}' not found")
         
         return {
-            "groupId": group_id, "groupName": group_name, "documents": documents, "total": len(documents)
+            "groupId": group_id, "groupName": group_name, "documents": documents,
+            "total": total, "limit": limit, "offset": offset
         }
     except HTTPException:
         raise
@@ -1298,22 +1533,13 @@ async def api_get_document_in_group(
 ):
     """Get a specific document in a group with its embedding vector (supports API Key authentication)."""
     try:
-        group = await prisma.documentgroup.find_first(
-            where={"userId": current_user.id, "name": group_name}
+        document, group_id = await store.get_document_in_group_by_name(
+            user_id=current_user.id, group_name=group_name, doc_id=doc_id, include_vector=include_vector
         )
         
-        if not group:
+        if group_id is None:
             raise HTTPException(status_code=404, detail=f"Group '{group_name}' not found")
         
-        if include_vector:
-            document = await store.get_document_with_vector(
-                user_id=current_user.id, doc_id=doc_id, group_id=group.id
-            )
-        else:
-            document = await store.get_document(user_id=current_user.id, doc_id=doc_id)
-            if document and document.get("group") and document["group"].get("id") != group.id:
-                document = None
-        
         if not document:
             raise HTTPException(status_code=404, detail=f"Document {doc_id} not found in group '{group_name}'")
         
@@ -1352,17 +1578,11 @@ async def api_delete_group_by_name(
 ):
     """Delete a document group by name (supports API Key authentication)."""
     try:
-        group = await prisma.documentgroup.find_first(
-            where={"userId": current_user.id, "name": group_name}
-        )
-        if not group:
-            raise HTTPException(status_code=404, detail=f"Group '{group_name}' not found")
-        
-        result = await store.delete_group(
-            user_id=current_user.id, group_id=group.id, delete_documents=delete_documents
+        result = await store.delete_group_by_name(
+            user_id=current_user.id, name=group_name, delete_documents=delete_documents
         )
         if result is None:
-            raise HTTPException(status_code=404, detail="Group not found or permission denied")
+            raise HTTPException(status_code=404, detail=f"Group '{group_name}' not found")
         
         result["groupName"] = group_name
         return result
@@ -1396,11 +1616,10 @@ async def import_from_url(
         if not url.startswith(("http://", "https://")):
             raise HTTPException(status_code=400, detail="URL must start with http:// or https://")
         
-        # Use MCP client to crawl the URL
-        mcp_client = MCPClient()
-        
+        # Use MCP client to crawl the URL (a blocking call; run it in a thread)
         try:
-            results = mcp_client.crawl_url_with_exa(
+            results = await asyncio.to_thread(
+                mcp_client.crawl_url_with_exa,
                 url=url,
                 max_characters=request.max_characters
             )
@@ -1428,9 +1647,17 @@ async def import_from_url(
                 detail="No content could be extracted from the URL"
             )
         
-        # Use LLM to convert content to Markdown
-        llm = LLMService()
+        # Pages that are already Markdown (READMEs, docs sites) need no LLM pass
+        if looks_like_markdown(raw_content):
+            markdown_content = raw_content.strip()
+            return UrlImportResponse(
+                content=markdown_content,
+                source_url=url,
+                title=title,
+                content_length=len(markdown_content)
+            )
         
+        # Use LLM to convert content to Markdown
         system_prompt = """You are a content formatting expert. Your task is to convert the given web content into clean, well-structured Markdown format.
 
 Rules:
@@ -1451,7 +1678,8 @@ Rules:
 Output ONLY the formatted Markdown content, nothing else."""
 
         try:
-            markdown_content = llm.chat_completion(
+            markdown_content = await asyncio.to_thread(
+                llm_service.chat_completion,
                 query=user_prompt,
                 contexts=[],
                 system_prompt=system_prompt,
@@ -1463,15 +1691,10 @@ Output ONLY the formatted Markdown content, nothing else."""
             markdown_content = markdown_content.strip()
             
             # Remove markdown code block wrapper if LLM added it
-            if markdown_content.startswith("```markdown"):
-                lines = markdown_content.split("\n")
-                markdown_content = "\n".join(lines[1:-1] if lines[-1].strip() == "```" else lines[1:])
-            elif markdown_content.startswith("```"):
-                lines = markdown_content.split("\n")
-                markdown_content = "\n".join(lines[1:-1] if lines[-1].strip() == "```" else lines[1:])
+            markdown_content = strip_code_fence(markdown_content)
                 
         except Exception as llm_error:
-            print(f"LLM formatting failed: {llm_error}")
+            logger.warning("LLM formatting failed: %s", llm_error)
             # Fallback to raw content if LLM fails
             markdown_content = raw_content.strip()
         
@@ -1485,5 +1708,5 @@ Output ONLY the formatted Markdown content, nothing else."""
     except HTTPException:
         raise
     except Exception as e:
-        print(f"URL import error: {e}")
+        logger.exception("URL import error")
         raise HTTPException(status_code=500, detail=f"Failed to import from URL: {str(e)}")
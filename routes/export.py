@@ -1,8 +1,10 @@
 """User data export routes."""
 
+import asyncio
+import orjson
 from fastapi import APIRouter, HTTPException, Depends, Query
-from fastapi.responses import JSONResponse
-from typing import Optional
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import AsyncIterator, Optional
 from datetime import datetime, timezone
 
 from auth import get_current_user, prisma
@@ -14,6 +16,30 @@ router = APIRouter(prefix="/user", tags=["export"])
 # Export rate limit: 24 hours in seconds
 EXPORT_COOLDOWN_SECONDS = 86400
 
+# Number of documents fetched per query while streaming an export
+EXPORT_DOCUMENT_BATCH_SIZE = 500
+
+# Each row comes back as ready-to-send JSON text; timestamps are stored as UTC
+EXPORT_DOCUMENTS_QUERY = """
+    SELECT id, json_build_object(
+        'id', id,
+        'content', content,
+        'metadata', metadata,
+        'groupId', "groupId",
+        'createdAt', to_char("createdAt", 'YYYY-MM-DD"T"HH24:MI:SS.US"+00:00"'),
+        'updatedAt', to_char("updatedAt", 'YYYY-MM-DD"T"HH24:MI:SS.US"+00:00"')
+    )::text AS item
+    FROM "Document"
+    WHERE "userId" = $1 AND ($2::int IS NULL OR id < $2)
+    ORDER BY id DESC
+    LIMIT $3
+"""
+
+
+def _format_remaining(seconds: int) -> str:
+    """Format a cooldown as hours and minutes."""
+    return f"{seconds // 3600}h {(seconds % 3600) // 60}m"
+
 
 async def check_export_limit(user_id: int) -> Optional[str]:
     """
@@ -24,39 +50,75 @@ async def check_export_limit(user_id: int) -> Optional[str]:
     """
     try:
         client = RedisService.get_client()
-        key = f"export_limit:{user_id}"
-        
-        last_export = await client.get(key)
-        if last_export:
-            last_export_time = datetime.fromisoformat(last_export)
-            now = datetime.now(timezone.utc)
-            elapsed = (now - last_export_time).total_seconds()
-            remaining = EXPORT_COOLDOWN_SECONDS - elapsed
-            
-            if remaining > 0:
-                hours = int(remaining // 3600)
-                minutes = int((remaining % 3600) // 60)
-                return f"{hours}h {minutes}m"
-        
-        return None
+        remaining = await client.ttl(f"export_limit:{user_id}")
+        return _format_remaining(remaining) if remaining > 0 else None
     except RuntimeError:
         # Redis not connected, allow export
         return None
 
 
-async def set_export_timestamp(user_id: int) -> None:
-    """Record the export timestamp for rate limiting."""
+async def claim_export_slot(user_id: int) -> Optional[str]:
+    """
+    Start the export cooldown unless one is already running.
+    
+    SET NX makes the check and the claim a single atomic command.
+    
+    Returns:
+        None if the export may proceed, otherwise the remaining time message.
+    """
     try:
         client = RedisService.get_client()
         key = f"export_limit:{user_id}"
         now = datetime.now(timezone.utc).isoformat()
-        await client.set(key, now, ex=EXPORT_COOLDOWN_SECONDS)
+        if await client.set(key, now, ex=EXPORT_COOLDOWN_SECONDS, nx=True):
+            return None
+        
+        remaining = await client.ttl(key)
+        return _format_remaining(remaining) if remaining > 0 else None
+    except RuntimeError:
+        # Redis not connected, allow export
+        return None
+
+
+async def release_export_slot(user_id: int) -> None:
+    """Lift the cooldown after an export that failed."""
+    try:
+        await RedisService.get_client().delete(f"export_limit:{user_id}")
     except RuntimeError:
-        # Redis not connected, skip recording
         pass
 
 
-@router.get("/export", response_model=UserDataExportResponse)
+async def _iter_export(user_id: int, export_data: dict, include_documents: bool) -> AsyncIterator[bytes]:
+    """Yield the export as one JSON object, streaming the documents array in batches."""
+    try:
+        if not include_documents:
+            yield orjson.dumps(export_data)
+        else:
+            # Reopen the object to append the documents array
+            yield orjson.dumps(export_data)[:-1] + b',"documents":['
+            before_id = None
+            first = True
+            while True:
+                # Newest first, paging on id so each batch is an index range scan
+                rows = await prisma.query_raw(
+                    EXPORT_DOCUMENTS_QUERY, user_id, before_id, EXPORT_DOCUMENT_BATCH_SIZE
+                )
+                if not rows:
+                    break
+                chunk = ",".join(row["item"] for row in rows).encode()
+                yield chunk if first else b"," + chunk
+                first = False
+                if len(rows) < EXPORT_DOCUMENT_BATCH_SIZE:
+                    break
+                before_id = rows[-1]["id"]
+            yield b"]}"
+    except Exception:
+        # A failed export does not use up the user's daily export
+        await release_export_slot(user_id)
+        raise
+
+
+@router.get("/export", responses={200: {"model": UserDataExportResponse}})
 async def export_user_data(
     include_documents: bool = Query(True, description="Include documents"),
     include_groups: bool = Query(True, description="Include document groups"),
@@ -68,10 +130,11 @@ async def export_user_data(
     """
     Export all user data as JSON.
     
-    Rate limited to once per 24 hours.
+    The response is streamed, with documents read in batches so memory use
+    does not grow with the number of documents. Rate limited to once per 24 hours.
     """
-    # Check export rate limit
-    remaining_time = await check_export_limit(current_user.id)
+    # Check and claim the export rate limit
+    remaining_time = await claim_export_slot(current_user.id)
     if remaining_time:
         raise HTTPException(
             status_code=429,
@@ -79,8 +142,9 @@ async def export_user_data(
         )
     
     try:
+        # Datetimes are left to orjson, which writes the same ISO 8601 text
         export_data = {
-            "exportedAt": datetime.now(timezone.utc).isoformat(),
+            "exportedAt": datetime.now(timezone.utc),
             "version": "1.0",
             "user": {
                 "id": current_user.id,
@@ -94,52 +158,57 @@ async def export_user_data(
             }
         }
         
-        # Export documents
-        if include_documents:
-            documents = await prisma.document.find_many(
+        # The remaining collections are independent; fetch them concurrently
+        # before the response starts, so errors still map to a status code
+        queries = {}
+        if include_groups:
+            queries["groups"] = prisma.documentgroup.find_many(
                 where={"userId": current_user.id},
                 order={"createdAt": "desc"}
             )
-            export_data["documents"] = [
-                {
-                    "id": doc.id,
-                    "content": doc.content,
-                    "metadata": doc.metadata,
-                    "groupId": doc.groupId,
-                    "createdAt": doc.createdAt.isoformat() if doc.createdAt else None,
-                    "updatedAt": doc.updatedAt.isoformat() if doc.updatedAt else None,
-                }
-                for doc in documents
-            ]
-        
-        # Export document groups
-        if include_groups:
-            groups = await prisma.documentgroup.find_many(
+            # Get document counts for all groups in one query
+            queries["group_counts"] = prisma.query_raw(
+                """
+                SELECT "groupId", COUNT(*)::int AS count
+                FROM "Document"
+                WHERE "userId" = $1 AND "groupId" IS NOT NULL
+                GROUP BY "groupId"
+                """,
+                current_user.id,
+            )
+        if include_activities:
+            queries["activities"] = prisma.activity.find_many(
                 where={"userId": current_user.id},
                 order={"createdAt": "desc"}
             )
-            
-            # Get document counts for each group
-            group_data = []
-            for group in groups:
-                doc_count = await prisma.document.count(
-                    where={"groupId": group.id}
-                )
-                group_data.append({
+        if include_transactions:
+            queries["transactions"] = prisma.transaction.find_many(
+                where={"userId": current_user.id},
+                order={"createdAt": "desc"}
+            )
+        if include_api_keys:
+            queries["api_keys"] = prisma.apikey.find_many(
+                where={"userId": current_user.id},
+                order={"createdAt": "desc"}
+            )
+        results = dict(zip(queries, await asyncio.gather(*queries.values())))
+        
+        # Export document groups
+        if include_groups:
+            doc_counts = {row["groupId"]: row["count"] for row in results["group_counts"]}
+            export_data["groups"] = [
+                {
                     "id": group.id,
                     "name": group.name,
-                    "documentCount": doc_count,
-                    "createdAt": group.createdAt.isoformat() if group.createdAt else None,
-                    "updatedAt": group.updatedAt.isoformat() if group.updatedAt else None,
-                })
-            export_data["groups"] = group_data
+                    "documentCount": doc_counts.get(group.id, 0),
+                    "createdAt": group.createdAt,
+                    "updatedAt": group.updatedAt,
+                }
+                for group in results["groups"]
+            ]
         
         # Export activities
         if include_activities:
-            activities = await prisma.activity.find_many(
-                where={"userId": current_user.id},
-                order={"createdAt": "desc"}
-            )
             export_data["activities"] = [
                 {
                     "id": act.id,
@@ -147,17 +216,13 @@ async def export_user_data(
                     "title": act.title,
                     "description": act.description,
                     "metadata": act.metadata,
-                    "createdAt": act.createdAt.isoformat() if act.createdAt else None,
+                    "createdAt": act.createdAt,
                 }
-                for act in activities
+                for act in results["activities"]
             ]
         
         # Export transactions
         if include_transactions:
-            transactions = await prisma.transaction.find_many(
-                where={"userId": current_user.id},
-                order={"createdAt": "desc"}
-            )
             export_data["transactions"] = [
                 {
                     "id": txn.id,
@@ -170,37 +235,34 @@ async def export_user_data(
                     "referenceId": txn.referenceId,
                     "referenceType": txn.referenceType,
                     "metadata": txn.metadata,
-                    "createdAt": txn.createdAt.isoformat() if txn.createdAt else None,
-                    "updatedAt": txn.updatedAt.isoformat() if txn.updatedAt else None,
+                    "createdAt": txn.createdAt,
+                    "updatedAt": txn.updatedAt,
                 }
-                for txn in transactions
+                for txn in results["transactions"]
             ]
         
         # Export API keys (mask the actual key values)
         if include_api_keys:
-            api_keys = await prisma.apikey.find_many(
-                where={"userId": current_user.id},
-                order={"createdAt": "desc"}
-            )
             export_data["apiKeys"] = [
                 {
                     "id": key.id,
                     "name": key.name,
                     "keyPrefix": key.key[:8] + "..." if key.key else None,
                     "isActive": key.isActive,
-                    "createdAt": key.createdAt.isoformat() if key.createdAt else None,
-                    "expiresAt": key.expiresAt.isoformat() if key.expiresAt else None,
-                    "lastUsedAt": key.lastUsedAt.isoformat() if key.lastUsedAt else None,
+                    "createdAt": key.createdAt,
+                    "expiresAt": key.expiresAt,
+                    "lastUsedAt": key.lastUsedAt,
                 }
-                for key in api_keys
+                for key in results["api_keys"]
             ]
         
-        # Record this export for rate limiting
-        await set_export_timestamp(current_user.id)
-        
-        return export_data
+        return StreamingResponse(
+            _iter_export(current_user.id, export_data, include_documents),
+            media_type="application/json",
+        )
         
     except Exception as e:
+        await release_export_slot(current_user.id)
         raise HTTPException(status_code=500, detail=str(e))
 
 
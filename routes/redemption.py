@@ -8,9 +8,8 @@ Provides endpoints for:
 
 from fastapi import APIRouter, Depends, HTTPException, Query
 from typing import Optional, List, Dict, Any
-from prisma import Prisma
 
-from auth import get_current_user
+from auth import get_current_user, prisma
 from credits_service import CreditsService
 from redemption_service import RedemptionService
 from schemas import (
@@ -23,18 +22,14 @@ from schemas import (
 
 router = APIRouter(prefix="/redemption", tags=["redemption"])
 
-# Use shared Prisma instance if possible, otherwise create new global
-# Ideally we should import prisma from a common database module or reuse from main/auth
-# Here we define a local one for simplicity as seen in credits.py 
-# (Note: In production app, usually a single Prisma client is shared via Dependency Injection container or app state)
-prisma = Prisma()
+# The services only hold the shared Prisma client, so one instance serves every request
+redemption_service = RedemptionService(prisma, CreditsService(prisma))
 
 async def get_redemption_service() -> RedemptionService:
     """Get redemption service instance."""
     if not prisma.is_connected():
         await prisma.connect()
-    credits_service = CreditsService(prisma)
-    return RedemptionService(prisma, credits_service)
+    return redemption_service
 
 # =====================
 # User Routes
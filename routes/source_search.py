@@ -1,8 +1,10 @@
 """Source search routes for discovering and importing URLs."""
 
-from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
-from typing import Dict, Optional
+from fastapi import APIRouter, HTTPException, Depends, Response
+from typing import Dict, Optional, Set, Tuple
 import json
+import re
+import time
 import uuid
 import asyncio
 
@@ -17,37 +19,146 @@ from schemas import (
 )
 from auth import get_chat_user
 from redis_service import RedisService
-from llm_service import LLMService
+from llm_service import LLMService, strip_code_fence
+from llm_cache import memoized_chat
 from mcp_client import MCPClient
 import ftfy
 from datetime import datetime
 
 router = APIRouter()
 
-# In-memory task storage (fallback when Redis unavailable)
-source_search_tasks: Dict[str, SourceSearchStatus] = {}
+# In-memory task storage (fallback when Redis unavailable), mapping each
+# task to (last saved time, status); oldest-saved entries come first
+source_search_tasks: Dict[str, Tuple[float, SourceSearchStatus]] = {}
+
+# Running search tasks; holding a reference keeps them from being garbage collected
+running_search_tasks: Dict[str, asyncio.Task] = {}
 
 # Redis key prefix for source search tasks
 REDIS_KEY_PREFIX = "source_search:"
 REDIS_KEY_EXPIRE = 3600  # 1 hour
 
+# Tasks kept in memory at most; entries also expire after REDIS_KEY_EXPIRE
+MEMORY_TASKS_MAX = 10000
+
+# Any character ftfy.fix_text might change: everything outside printable
+# ASCII, tab and newline, plus '&' (HTML entities) and '\r' (line breaks)
+_FTFY_CANDIDATE_RE = re.compile(r'[^\t\n\x20-\x25\x27-\x7e]')
+
+# URLs crawled and formatted at the same time in a batch import
+BATCH_IMPORT_MAX_CONCURRENCY = 5
+
+# Crawled pages rarely change, so their markdown conversions are kept longer
+MARKDOWN_CACHE_TTL = 86400  # 24 hours
+
+
+def _truncate_at_boundary(text: str, limit: int) -> str:
+    """Cut text to at most limit characters, preferring a paragraph or sentence end.
+
+    Falls back to a hard cut when no boundary lies in the second half of the budget.
+    """
+    if len(text) <= limit:
+        return text
+    cut = text.rfind("\n\n", 0, limit)
+    if cut < limit // 2:
+        cut = max(text.rfind(". ", 0, limit - 1) + 1, text.rfind("\n", 0, limit))
+    if cut < limit // 2:
+        cut = limit
+    return text[:cut]
+
+
+def _maybe_fix(text: str) -> str:
+    """Fix encoding issues with ftfy, skipping text it would return unchanged."""
+    if not text or (text.isascii() and not _FTFY_CANDIDATE_RE.search(text)):
+        return text
+    return ftfy.fix_text(text)
+
+
+def _parse_exa_text(raw_text: str) -> Tuple[str, str, str]:
+    """Split an Exa text result into (url, title, text).
+
+    The format is line-prefixed header fields followed by the body:
+        Title: xxx
+        Author: xxx
+        Published Date: xxx
+        URL: https://...
+        Text: ...
+    Header lines are scanned one at a time up to "Text:", so the body is
+    never split or searched. Without a "Text:" line the whole result is the text.
+    """
+    url = ""
+    title = ""
+    pos = 0
+    while pos < len(raw_text):
+        end = raw_text.find("\n", pos)
+        if end == -1:
+            end = len(raw_text)
+        line = raw_text[pos:end]
+        if line.startswith("Text:"):
+            return url, title, raw_text[pos + 5:].strip()
+        if line.startswith("URL:") and not url:
+            candidate = line[4:].strip()
+            if candidate.startswith(("http://", "https://")):
+                url = candidate.split(None, 1)[0]
+        elif line.startswith("Title:") and not title:
+            title = line[6:].strip()
+        pos = end + 1
+    return url, title, raw_text
 
-async def get_task_status(task_id: str, user_id: int) -> Optional[SourceSearchStatus]:
-    """Get task status from Redis or memory."""
+
+def _json_array_complete(text: str) -> bool:
+    """Whether text already holds a complete top-level JSON array.
+
+    Brackets inside string literals are ignored, so a streamed reply can be
+    cut off right after its closing bracket.
+    """
+    start = text.find("[")
+    if start == -1:
+        return False
+    depth = 0
+    in_string = False
+    escaped = False
+    for char in text[start:]:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char == "[":
+            depth += 1
+        elif char == "]":
+            depth -= 1
+            if depth == 0:
+                return True
+    return False
+
+
+async def get_task_status_json(task_id: str, user_id: int) -> Optional[str]:
+    """Get task status as JSON text from Redis or memory.
+
+    The stored JSON was produced from a SourceSearchStatus by save_task_status,
+    so polls pass it through as-is instead of parsing and re-validating it.
+    """
     key = f"{REDIS_KEY_PREFIX}{user_id}:{task_id}"
     
     try:
         client = RedisService.get_client()
         data = await client.get(key)
         if data:
-            task_data = json.loads(data)
-            return SourceSearchStatus(**task_data)
+            return data
     except Exception:
         pass
     
     # Fallback to memory
     memory_key = f"{user_id}:{task_id}"
-    return source_search_tasks.get(memory_key)
+    entry = source_search_tasks.get(memory_key)
+    if entry and time.monotonic() - entry[0] < REDIS_KEY_EXPIRE:
+        return entry[1].model_dump_json()
+    return None
 
 
 async def save_task_status(task_id: str, user_id: int, status: SourceSearchStatus):
@@ -55,8 +166,18 @@ async def save_task_status(task_id: str, user_id: int, status: SourceSearchStatu
     key = f"{REDIS_KEY_PREFIX}{user_id}:{task_id}"
     memory_key = f"{user_id}:{task_id}"
     
-    # Always save to memory as backup
-    source_search_tasks[memory_key] = status
+    # Always save to memory as backup, re-inserting so the dict stays in save order
+    now = time.monotonic()
+    source_search_tasks.pop(memory_key, None)
+    source_search_tasks[memory_key] = (now, status)
+    
+    # Evict expired entries and anything over the size cap, oldest first
+    while source_search_tasks:
+        oldest_key = next(iter(source_search_tasks))
+        saved_at = source_search_tasks[oldest_key][0]
+        if len(source_search_tasks) <= MEMORY_TASKS_MAX and now - saved_at < REDIS_KEY_EXPIRE:
+            break
+        del source_search_tasks[oldest_key]
     
     try:
         client = RedisService.get_client()
@@ -75,7 +196,7 @@ async def source_search_background(
     """Background task to perform iterative source search."""
     try:
         # Initialize task status
-        status = SourceSearchStatus(
+        status = SourceSearchStatus.model_construct(
             task_id=task_id,
             status="searching",
             current_round=0,
@@ -87,7 +208,7 @@ async def source_search_background(
         
         mcp_client = MCPClient()
         llm_service = LLMService()
-        all_results: Dict[str, SourceSearchResult] = {}  # URL as key for dedup
+        seen_urls: Set[str] = set()  # for dedup; results are appended to status.results
         
         current_date = datetime.now().strftime('%Y-%m-%d')
 
@@ -105,18 +226,16 @@ Topic: {query}
 Respond with ONLY a JSON array of search query strings:
 ["query1", "query2", "query3"]"""
             
-            query_response = llm_service.chat_completion(
+            query_response = await memoized_chat(
+                llm_service,
                 query=query_prompt,
-                contexts=[],
                 system_prompt=f"You are a search query optimizer. Current Date: {current_date}. Output only a JSON array of search queries.",
                 temperature=0.5,
                 max_tokens=200,
+                until=_json_array_complete,
             )
             
-            query_response = query_response.strip()
-            if query_response.startswith("```"):
-                lines = query_response.split("\n")
-                query_response = "\n".join(lines[1:-1] if lines[-1].startswith("```") else lines[1:])
+            query_response = strip_code_fence(query_response.strip())
             
             initial_queries = json.loads(query_response)
             if isinstance(initial_queries, list) and len(initial_queries) > 0:
@@ -134,17 +253,27 @@ Respond with ONLY a JSON array of search query strings:
             
             round_results = []
             
-            # Execute searches for current round's queries
-            for search_query in search_queries[:3]:  # Limit to 3 queries per round
-                try:
-                    results = mcp_client.search_with_exa(
+            # Execute searches for current round's queries (limit 3 per round);
+            # they are independent blocking calls, so run them concurrently
+            round_search_results = await asyncio.gather(
+                *[
+                    asyncio.to_thread(
+                        mcp_client.search_with_exa,
                         query=search_query,
                         num_results=results_per_round,
                         livecrawl="fallback",
                         search_type="auto",
                         context_max_characters=3000,
                     )
-                    
+                    for search_query in search_queries[:3]
+                ],
+                return_exceptions=True,
+            )
+            
+            for results in round_search_results:
+                if isinstance(results, Exception):
+                    continue
+                try:
                     # Handle different result formats
                     items_to_process = []
                     
@@ -177,32 +306,7 @@ Respond with ONLY a JSON array of search query strings:
                         if isinstance(result, dict):
                             # Check if it's the Exa text format: {'type': 'text', 'text': '...'}
                             if result.get("type") == "text" and "text" in result:
-                                raw_text = result.get("text", "")
-                                
-                                # Parse the embedded format:
-                                # Title: xxx
-                                # Author: xxx
-                                # Published Date: xxx
-                                # URL: https://...
-                                # Text: ...
-                                import re
-                                
-                                # Extract URL
-                                url_match = re.search(r'URL:\s*(https?://[^\s\n]+)', raw_text)
-                                if url_match:
-                                    url = url_match.group(1).strip()
-                                
-                                # Extract Title
-                                title_match = re.search(r'Title:\s*([^\n]+)', raw_text)
-                                if title_match:
-                                    title = title_match.group(1).strip()
-                                
-                                # Extract the actual text content (after "Text: ")
-                                text_match = re.search(r'Text:\s*(.*)', raw_text, re.DOTALL)
-                                if text_match:
-                                    text = text_match.group(1).strip()
-                                else:
-                                    text = raw_text
+                                url, title, text = _parse_exa_text(result.get("text", ""))
                                     
                             else:
                                 # Standard dict format
@@ -211,12 +315,12 @@ Respond with ONLY a JSON array of search query strings:
                                 text = result.get("text", "") or result.get("content", "") or result.get("snippet", "")
                         
                         # Skip if no URL or already have it
-                        if not url or url in all_results:
+                        if not url or url in seen_urls:
                             continue
                             
                         # Fix encoding issues using ftfy
-                        text = ftfy.fix_text(text)
-                        title = ftfy.fix_text(title)
+                        text = _maybe_fix(text)
+                        title = _maybe_fix(title)
                         
                         # Create snippet from text
                         snippet = text[:300] + "..." if len(text) > 300 else text
@@ -227,13 +331,13 @@ Respond with ONLY a JSON array of search query strings:
                             snippet=snippet,
                         )
                         round_results.append(search_result)
-                        all_results[url] = search_result
+                        status.results.append(search_result)
+                        seen_urls.add(url)
                             
                 except Exception:
                     continue
             
-            # Update results after each round
-            status.results = list(all_results.values())
+            # Save the results gathered so far after each round
             await save_task_status(task_id, user_id, status)
             
             # If this is not the last round, generate new search queries using LLM
@@ -256,19 +360,17 @@ Current search results:
 Respond with ONLY a JSON array of search query strings, nothing else:
 ["query1", "query2", "query3"]"""
 
-                    response = llm_service.chat_completion(
+                    response = await memoized_chat(
+                        llm_service,
                         query=prompt,
-                        contexts=[],
                         system_prompt=f"You are a search query generator. Current Date: {current_date}. Respond only with a JSON array of search queries.",
                         temperature=0.7,
                         max_tokens=200,
+                        until=_json_array_complete,
                     )
                     
                     # Parse new queries
-                    response = response.strip()
-                    if response.startswith("```"):
-                        lines = response.split("\n")
-                        response = "\n".join(lines[1:-1] if lines[-1].startswith("```") else lines[1:])
+                    response = strip_code_fence(response.strip())
                     
                     new_queries = json.loads(response)
                     if isinstance(new_queries, list) and len(new_queries) > 0:
@@ -277,17 +379,14 @@ Respond with ONLY a JSON array of search query strings, nothing else:
                 except Exception:
                     # Continue with original query if LLM fails
                     search_queries = [query]
-            
-            # Small delay between rounds
-            await asyncio.sleep(0.5)
         
         # Complete the task
         status.status = "completed"
-        status.message = f"Found {len(all_results)} unique sources"
+        status.message = f"Found {len(seen_urls)} unique sources"
         await save_task_status(task_id, user_id, status)
         
     except Exception as e:
-        status = SourceSearchStatus(
+        status = SourceSearchStatus.model_construct(
             task_id=task_id,
             status="failed",
             current_round=0,
@@ -302,7 +401,6 @@ Respond with ONLY a JSON array of search query strings, nothing else:
 @router.post("/documents/source-search", response_model=SourceSearchTaskResponse)
 async def start_source_search(
     request: SourceSearchRequest,
-    background_tasks: BackgroundTasks,
     current_user=Depends(get_chat_user),
 ):
     """
@@ -323,7 +421,7 @@ async def start_source_search(
         task_id = str(uuid.uuid4())[:8]
         
         # Create initial status
-        status = SourceSearchStatus(
+        status = SourceSearchStatus.model_construct(
             task_id=task_id,
             status="pending",
             current_round=0,
@@ -335,15 +433,17 @@ async def start_source_search(
         # Save initial status
         await save_task_status(task_id, current_user.id, status)
         
-        # Start background task
-        background_tasks.add_task(
-            source_search_background,
+        # Start the search as its own task; it runs for minutes and must not
+        # be tied to this request's lifecycle like a BackgroundTasks entry
+        task = asyncio.create_task(source_search_background(
             current_user.id,
             task_id,
             query,
             request.max_rounds,
             request.results_per_round,
-        )
+        ))
+        running_search_tasks[task_id] = task
+        task.add_done_callback(lambda _: running_search_tasks.pop(task_id, None))
         
         return SourceSearchTaskResponse(
             task_id=task_id,
@@ -357,7 +457,7 @@ async def start_source_search(
         raise HTTPException(status_code=500, detail=f"Failed to start source search: {str(e)}")
 
 
-@router.get("/documents/source-search/{task_id}", response_model=SourceSearchStatus)
+@router.get("/documents/source-search/{task_id}", responses={200: {"model": SourceSearchStatus}})
 async def get_source_search_status(
     task_id: str,
     current_user=Depends(get_chat_user),
@@ -368,12 +468,12 @@ async def get_source_search_status(
     Poll this endpoint to get updates on the search progress.
     """
     try:
-        status = await get_task_status(task_id, current_user.id)
+        status_json = await get_task_status_json(task_id, current_user.id)
         
-        if not status:
+        if not status_json:
             raise HTTPException(status_code=404, detail="Task not found")
         
-        return status
+        return Response(content=status_json, media_type="application/json")
         
     except HTTPException:
         raise
@@ -381,83 +481,63 @@ async def get_source_search_status(
         raise HTTPException(status_code=500, detail=f"Failed to get task status: {str(e)}")
 
 
-@router.post("/documents/batch-import-url", response_model=BatchUrlImportResponse)
-async def batch_import_urls(
-    request: BatchUrlImportRequest,
-    current_user=Depends(get_chat_user),
-):
-    """
-    Batch import content from multiple URLs.
+async def _import_url(
+    url: str,
+    max_characters: int,
+    mcp_client: MCPClient,
+    llm_service: LLMService,
+    semaphore: asyncio.Semaphore,
+) -> BatchUrlImportResult:
+    """Crawl one URL and convert it to markdown for a batch import."""
+    if not url.startswith(("http://", "https://")):
+        return BatchUrlImportResult(
+            url=url,
+            success=False,
+            error="URL must start with http:// or https://",
+        )
     
-    Each URL is crawled and converted to markdown format.
-    Returns success/failure status for each URL.
-    """
-    try:
-        if not request.urls:
-            raise HTTPException(status_code=400, detail="No URLs provided")
-        
-        if len(request.urls) > 20:
-            raise HTTPException(status_code=400, detail="Maximum 20 URLs per batch")
-        
-        mcp_client = MCPClient()
-        llm_service = LLMService()
-        results: list[BatchUrlImportResult] = []
-        
-        for url in request.urls:
-            url = url.strip()
-            if not url:
-                continue
-                
-            if not url.startswith(("http://", "https://")):
-                results.append(BatchUrlImportResult(
+    async with semaphore:
+        try:
+            # Crawl the URL (a blocking call; run it in a thread)
+            crawl_results = await asyncio.to_thread(
+                mcp_client.crawl_url_with_exa,
+                url=url,
+                max_characters=max_characters,
+            )
+            
+            if not crawl_results:
+                return BatchUrlImportResult(
                     url=url,
                     success=False,
-                    error="URL must start with http:// or https://",
-                ))
-                continue
+                    error="No content returned from URL",
+                )
             
-            try:
-                # Crawl the URL
-                crawl_results = mcp_client.crawl_url_with_exa(
+            # Extract content and title
+            raw_content = ""
+            title = None
+            
+            for item in crawl_results:
+                if isinstance(item, dict):
+                    raw_content = item.get("text", "") or item.get("content", "")
+                    title = item.get("title")
+                    if raw_content:
+                        break
+            
+            if not raw_content.strip():
+                return BatchUrlImportResult(
                     url=url,
-                    max_characters=request.max_characters,
+                    success=False,
+                    error="No text content could be extracted",
                 )
-                
-                if not crawl_results:
-                    results.append(BatchUrlImportResult(
-                        url=url,
-                        success=False,
-                        error="No content returned from URL",
-                    ))
-                    continue
-                
-                # Extract content and title
-                raw_content = ""
-                title = None
-                
-                for item in crawl_results:
-                    if isinstance(item, dict):
-                        raw_content = item.get("text", "") or item.get("content", "")
-                        title = item.get("title")
-                        if raw_content:
-                            break
-                
-                if not raw_content.strip():
-                    results.append(BatchUrlImportResult(
-                        url=url,
-                        success=False,
-                        error="No text content could be extracted",
-                    ))
-                    continue
 
-                # Fix encoding issues using ftfy
-                raw_content = ftfy.fix_text(raw_content)
-                if title:
-                    title = ftfy.fix_text(title)
-                
-                # Convert to markdown using LLM
-                try:
-                    format_prompt = f"""Convert the following web content to clean, well-formatted Markdown.
+            # Fix encoding issues using ftfy; the page body is only fixed if it
+            # is returned as-is below, since the formatter rewrites it anyway
+            if title:
+                title = _maybe_fix(title)
+            
+            # Convert to markdown using LLM
+            try:
+                format_prompt = f"""Convert the following web content to clean, well-formatted Markdown.
 Current Date: {datetime.now().strftime('%Y-%m-%d')}
 
 Rules:
@@ -471,38 +551,74 @@ Rules:
 Source URL: {url}
 
 Content:
-{raw_content[:15000]}"""
-
-                    markdown_content = llm_service.chat_completion(
-                        query=format_prompt,
-                        contexts=[],
-                        system_prompt="You are a web content formatter. Convert web content to clean markdown. Output only the formatted markdown, no explanations.",
-                        temperature=0.3,
-                        max_tokens=4000,
-                    )
-                    markdown_content = markdown_content.strip()
-                    
-                    # Check if LLM returned an error or empty content
-                    if not markdown_content or len(markdown_content) < 10:
-                        markdown_content = raw_content.strip()
-                        
-                except Exception:
-                    markdown_content = raw_content.strip()
-                
-                results.append(BatchUrlImportResult(
-                    url=url,
-                    success=True,
-                    content=markdown_content,
-                    title=title,
-                    content_length=len(markdown_content),
-                ))
+{_truncate_at_boundary(raw_content, 15000)}"""
+
+                markdown_content = await memoized_chat(
+                    llm_service,
+                    query=format_prompt,
+                    system_prompt="You are a web content formatter. Convert web content to clean markdown. Output only the formatted markdown, no explanations.",
+                    ttl=MARKDOWN_CACHE_TTL,
+                    temperature=0.3,
+                    max_tokens=4000,
+                )
+                markdown_content = markdown_content.strip()
                 
-            except Exception as crawl_error:
-                results.append(BatchUrlImportResult(
-                    url=url,
-                    success=False,
-                    error=str(crawl_error),
-                ))
+                # Check if LLM returned an error or empty content
+                if not markdown_content or len(markdown_content) < 10:
+                    markdown_content = _maybe_fix(raw_content).strip()
+                    
+            except Exception:
+                markdown_content = _maybe_fix(raw_content).strip()
+            
+            return BatchUrlImportResult(
+                url=url,
+                success=True,
+                content=markdown_content,
+                title=title,
+                content_length=len(markdown_content),
+            )
+            
+        except Exception as crawl_error:
+            return BatchUrlImportResult(
+                url=url,
+                success=False,
+                error=str(crawl_error),
+            )
+
+
+@router.post("/documents/batch-import-url", responses={200: {"model": BatchUrlImportResponse}})
+async def batch_import_urls(
+    request: BatchUrlImportRequest,
+    current_user=Depends(get_chat_user),
+):
+    """
+    Batch import content from multiple URLs.
+    
+    Each URL is crawled and converted to markdown format; up to
+    BATCH_IMPORT_MAX_CONCURRENCY URLs are processed at a time.
+    Returns success/failure status for each URL.
+    """
+    try:
+        if not request.urls:
+            raise HTTPException(status_code=400, detail="No URLs provided")
+        
+        if len(request.urls) > 20:
+            raise HTTPException(status_code=400, detail="Maximum 20 URLs per batch")
+        
+        mcp_client = MCPClient()
+        llm_service = LLMService()
+        semaphore = asyncio.Semaphore(BATCH_IMPORT_MAX_CONCURRENCY)
+        
+        urls = [url.strip() for url in request.urls if url.strip()]
+        # Each distinct URL is crawled once; duplicates share its result
+        unique_urls = list(dict.fromkeys(urls))
+        unique_results = await asyncio.gather(*[
+            _import_url(url, request.max_characters, mcp_client, llm_service, semaphore)
+            for url in unique_urls
+        ])
+        result_by_url = dict(zip(unique_urls, unique_results))
+        # Results come back in request order
+        results: list[BatchUrlImportResult] = [result_by_url[url] for url in urls]
         
         successful = sum(1 for r in results if r.success)
         failed = len(results) - successful
@@ -517,4 +633,4 @@ Content:
     except HTTPException:
         raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Batch import failed: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Batch import failed: {str(e)}")
@@ -1,7 +1,7 @@
 """Pydantic schemas for API request/response models."""
 
-from pydantic import BaseModel
-from typing import Dict, Any, List, Optional
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Dict, Any, List, Literal, Optional
 from datetime import datetime
 
 
@@ -12,7 +12,7 @@ from datetime import datetime
 
 class DocumentInput(BaseModel):
     content: str
-    metadata: Optional[Dict[str, Any]] = {}
+    metadata: Optional[Dict[str, Any]] = Field(default_factory=dict)
 
 
 class BatchDeleteInput(BaseModel):
@@ -28,10 +28,11 @@ class SearchResult(BaseModel):
 
 class PaginatedSearchResponse(BaseModel):
     results: List[SearchResult]
-    total: int
+    total: Optional[int] = None
     page: int
     page_size: int
-    total_pages: int
+    total_pages: Optional[int] = None
+    has_more: bool = False
 
 
 class DocumentGroup(BaseModel):
@@ -53,10 +54,11 @@ class DocumentItem(BaseModel):
 
 class PaginatedDocumentsResponse(BaseModel):
     documents: List[DocumentItem]
-    total: int
+    total: Optional[int] = None
     page: int
     page_size: int
-    total_pages: int
+    total_pages: Optional[int] = None
+    next_cursor: Optional[str] = None
 
 
 class DocumentGroupInput(BaseModel):
@@ -87,6 +89,7 @@ class BatchDeleteApiInput(BaseModel):
 
 class GroupExportRequest(BaseModel):
     include_vectors: bool = False
+    vector_dtype: Literal["float32", "float16"] = "float32"
 
 
 class GroupImportRequest(BaseModel):
@@ -150,7 +153,7 @@ class ActivityItem(BaseModel):
     title: str
     description: Optional[str] = None
     metadata: Optional[Dict[str, Any]] = None
-    createdAt: str
+    createdAt: datetime
 
 
 class ActivitiesResponse(BaseModel):
@@ -219,15 +222,11 @@ class OpenAIRequest(BaseModel):
     temperature: Optional[float] = 0.7
     max_tokens: Optional[int] = 1024
     top_k: Optional[int] = None
-    # use_history is kept for backward compatibility but conversation history
-    # is now always extracted from the messages array (standard OpenAI behavior)
-    use_history: Optional[bool] = True
-    # OpenAI compatible fields (ignored but accepted for compatibility)
-    top_p: Optional[float] = None
-    frequency_penalty: Optional[float] = None
-    presence_penalty: Optional[float] = None
-    stop: Optional[List[str]] = None
-    user: Optional[str] = None
+
+    # Other OpenAI fields (top_p, stop, user, ...) and the legacy use_history
+    # flag are accepted but unused, so they are dropped at parse time instead
+    # of being validated; history always comes from the messages array
+    model_config = ConfigDict(extra="ignore")
 
 
 class RAGResponse(BaseModel):
@@ -252,9 +251,8 @@ class TransactionItem(BaseModel):
     metadata: Optional[Dict[str, Any]] = None
     createdAt: datetime
     updatedAt: datetime
-    
-    class Config:
-        from_attributes = True
+
+    model_config = ConfigDict(from_attributes=True)
 
 
 class TransactionResponse(BaseModel):
@@ -373,8 +371,8 @@ class ExportGroupItem(BaseModel):
     id: int
     name: str
     documentCount: int
-    createdAt: Optional[str] = None
-    updatedAt: Optional[str] = None
+    createdAt: Optional[datetime] = None
+    updatedAt: Optional[datetime] = None
 
 
 class ExportActivityItem(BaseModel):
@@ -383,7 +381,7 @@ class ExportActivityItem(BaseModel):
     title: str
     description: Optional[str] = None
     metadata: Optional[Dict[str, Any]] = None
-    createdAt: Optional[str] = None
+    createdAt: Optional[datetime] = None
 
 
 class ExportTransactionItem(BaseModel):
@@ -397,8 +395,8 @@ class ExportTransactionItem(BaseModel):
     referenceId: Optional[str] = None
     referenceType: Optional[str] = None
     metadata: Optional[Dict[str, Any]] = None
-    createdAt: Optional[str] = None
-    updatedAt: Optional[str] = None
+    createdAt: Optional[datetime] = None
+    updatedAt: Optional[datetime] = None
 
 
 class ExportApiKeyItem(BaseModel):
@@ -406,9 +404,9 @@ class ExportApiKeyItem(BaseModel):
     name: str
     keyPrefix: Optional[str] = None
     isActive: bool
-    createdAt: Optional[str] = None
-    expiresAt: Optional[str] = None
-    lastUsedAt: Optional[str] = None
+    createdAt: Optional[datetime] = None
+    expiresAt: Optional[datetime] = None
+    lastUsedAt: Optional[datetime] = None
 
 
 class UserDataExportResponse(BaseModel):
@@ -443,7 +441,7 @@ class FactCheckRequest(BaseModel):
 class FactCheckResponse(BaseModel):
     """Response containing fact check results."""
     credibility_score: int  # 0-100 percentage
-    verdict: str  # "verified" | "mostly_true" | "mixed" | "unverified" | "false"
+    verdict: Literal["verified", "mostly_true", "mixed", "unverified", "false"]
     analysis: str  # Detailed analysis explanation
     sources: List[FactCheckSource]  # Sources used for verification
     claims_checked: int  # Number of claims checked
@@ -471,7 +469,7 @@ class KnowledgeCheckRequest(BaseModel):
 class KnowledgeCheckResponse(BaseModel):
     """Response containing knowledge check results."""
     consistency_score: int  # 0-100 percentage
-    verdict: str  # "consistent" | "mostly_consistent" | "mixed" | "no_reference" | "inconsistent"
+    verdict: Literal["consistent", "mostly_consistent", "mixed", "no_reference", "inconsistent"]
     analysis: str  # Detailed analysis explanation
     sources: List[KnowledgeCheckSource]  # Source documents from knowledge base
     claims_checked: int  # Number of claims checked
@@ -482,10 +480,14 @@ class KnowledgeCheckResponse(BaseModel):
 # =====================
 
 
+# Largest crawl a URL import may request
+URL_IMPORT_MAX_CHARACTERS = 100_000
+
+
 class UrlImportRequest(BaseModel):
     """Request for importing content from a URL."""
     url: str
-    max_characters: int = 10000
+    max_characters: int = Field(10000, ge=1, le=URL_IMPORT_MAX_CHARACTERS)
 
 
 class UrlImportResponse(BaseModel):
@@ -519,11 +521,11 @@ class SourceSearchResult(BaseModel):
 class SourceSearchStatus(BaseModel):
     """Status of a source search task."""
     task_id: str
-    status: str  # "pending" | "searching" | "completed" | "failed"
+    status: Literal["pending", "searching", "completed", "failed"]
     current_round: int
     total_rounds: int
     message: str
-    results: List[SourceSearchResult] = []
+    results: List[SourceSearchResult] = Field(default_factory=list)
     error: Optional[str] = None
 
 
@@ -537,7 +539,7 @@ class SourceSearchTaskResponse(BaseModel):
 class BatchUrlImportRequest(BaseModel):
     """Request for batch importing multiple URLs."""
     urls: List[str]
-    max_characters: int = 15000
+    max_characters: int = Field(15000, ge=1, le=URL_IMPORT_MAX_CHARACTERS)
 
 
 class BatchUrlImportResult(BaseModel):